@@ -0,0 +1,120 @@
+import heapq
+import time
+from array import array
+
+from bitboard import Macro
+from progress import CHECK_EVERY, rss_mb
+from algorithms.astar import AStar
+from algorithms.heuristics import INF
+
+
+class AnytimeAStar(AStar):
+    # ARA*: a first solution from A* with a heavily weighted heuristic, then
+    # searches with smaller and smaller weights that keep the g-values found
+    # so far and only re-open states whose g improved. Stops when the weight
+    # reaches 1 (the solution is optimal) or the time / memory budget runs
+    # out, and returns the best solution found by then. Every improvement
+    # is appended to self.improvements and passed to on_solution.
+
+    WEIGHTS = (5.0, 3.0, 2.0, 1.5, 1.2, 1.0)
+
+    def __init__(self, game, mode="move", deadlocks=False, heuristic="matching", time_limit=60.0,
+                 memory_mb=None, weights=WEIGHTS, on_solution=None, macros=False):
+        # No memory budget, so the table keeps every g-value exactly.
+        super().__init__(game, mode=mode, deadlocks=deadlocks, heuristic=heuristic, table_mb=None,
+                         macros=macros)
+        self.time_limit = time_limit
+        self.memory_mb = memory_mb
+        self.weights = weights
+        self.on_solution = on_solution
+        self.improvements = []
+        self.bound = None
+
+    def _out_of_budget(self):
+        if time.time() > self.deadline:
+            return True
+        return self.memory_mb is not None and rss_mb() > self.memory_mb
+
+    def _found(self, start, parents, actions, node, cost, weight):
+        path = self.board.decode_path(parents, actions, node)
+        solution = self.board.expand_pushes(start, path) if self.push_mode else path
+        elapsed = round(time.time() - self.started, 3)
+        self.improvements.append({"time_sec": elapsed, "cost": cost, "length": len(solution), "weight": weight})
+        if self.on_solution is not None:
+            self.on_solution(solution, cost, weight)
+        return solution
+
+    def solve(self, start_state):
+        self.started = time.time()
+        self.deadline = self.started + self.time_limit
+        if self.macros is not None:
+            self.board.reset_macros()
+        start = self.board.pack(start_state)
+        root = self.board.normalize(start) if self.push_mode else start
+        if self.board.is_goal(root):
+            return []
+        key = self.zobrist.hash(root)
+        h = self.heuristic(root)
+        if h >= INF:
+            return None
+
+        # Node i was reached from node parents[i] by the encoded actions[i].
+        parents = array("i", [-1])
+        actions = array("i", [0])
+        g_of = self.table
+        g_of.clear()
+        g_of[key] = 0
+        best_cost, best = INF, None
+
+        # Heap entries are (g + weight * h, g, node, state, key, h).
+        open_list = [(0, 0, 0, root, key, h)]
+        incons = []
+        for weight in self.weights:
+            open_list = [(g + weight * h, g, node, state, key, h)
+                         for _, g, node, state, key, h in open_list + incons if g == g_of[key]]
+            heapq.heapify(open_list)
+            incons = []
+            closed = set()
+
+            while open_list and open_list[0][0] < best_cost:
+                f, g, node, state, key, h = heapq.heappop(open_list)
+                if g > g_of[key] or key in closed:
+                    continue
+                closed.add(key)
+
+                self.expanded += 1
+                if not self.expanded % CHECK_EVERY:
+                    if self.progress is not None:
+                        self.progress.update(self.expanded, len(open_list), len(g_of), f)
+                    if self._out_of_budget():
+                        return best
+
+                match = self.h.prepare(state)
+                for succ, action in self.successors(state):
+                    new_g = g + (len(action) if type(action) is Macro else 1)
+                    new_key = self.zobrist.update(key, state, succ)
+                    old_g = g_of.get(new_key)
+                    if old_g is not None and new_g >= old_g:
+                        continue
+                    new_h = self.h.estimate_child(match, state, succ)
+                    if new_h >= INF or new_g + new_h >= best_cost:
+                        continue
+                    g_of[new_key] = new_g
+                    parents.append(node)
+                    actions.append(self.board.encode_action(action))
+                    entry = (new_g + weight * new_h, new_g, len(actions) - 1, succ, new_key, new_h)
+                    if self.board.is_goal(succ):
+                        best_cost = new_g
+                        best = self._found(start, parents, actions, len(actions) - 1, new_g, weight)
+                    elif new_key in closed:
+                        incons.append(entry)
+                    else:
+                        heapq.heappush(open_list, entry)
+
+            # No open state can lead to a solution cheaper than best_cost / bound.
+            rest = [g + h for _, g, _, _, key, h in open_list + incons if g == g_of[key]]
+            self.bound = min(weight, best_cost / min(rest)) if rest and best is not None else 1.0
+            if self.bound <= 1.0 or self._out_of_budget():
+                break
+
+        return best
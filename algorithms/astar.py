@@ -1,76 +1,91 @@
 import heapq
+from array import array
+
+from bitboard import Macro
+from deadlock import DeadlockDetector
+from macros import MacroGenerator
+from progress import CHECK_EVERY
+from algorithms.heuristics import INF, make_heuristic
+from algorithms.transposition import ExactTable, TranspositionTable, Zobrist
 
 class AStar:
-    def __init__(self, game, max_expanded=100000):
+    def __init__(self, game, max_expanded=100000, mode="move", deadlocks=False, heuristic="matching",
+                 table_mb=16, table_policy="shallow", macros=False):
      
         self.game = game
+        self.board = game.board
         self.expanded = 0
         self.max_expanded = max_expanded
-
-        try:
-            self.walls = {(x, y)
-                          for y in range(self.game.height)
-                          for x in range(self.game.width)
-                          if self.game.map[y][x] == "#"}
-        except Exception:
-            
-            self.walls = set()
+        self.push_mode = mode == "push"
+        self.successors = self.board.push_successors if self.push_mode else self.board.successors
+        self.macros = None
+        if macros and self.push_mode:
+            # Macro steps cost as many pushes as they hold.
+            self.macros = MacroGenerator(self.board, self.board.pack(game.get_start_state()))
+            self.successors = self.macros.wrap(self.successors)
+        self.detector = None
+        if deadlocks:
+            self.detector = DeadlockDetector(self.board)
+            self.successors = self.detector.wrap(self.successors)
+        self.h = make_heuristic(heuristic, self.board)
+        self.zobrist = Zobrist(self.board)
+        # Without a memory budget the g-values are kept exactly.
+        self.table = TranspositionTable(table_mb, table_policy) if table_mb else ExactTable()
+        self.progress = None
 
     def heuristic(self, state):
-        _, boxes = state
-        h = 0
-        for box in boxes:
-            d = min(abs(box[0]-g[0]) + abs(box[1]-g[1]) for g in self.game.goals)
-            h += d
-        return h
+        return self.h.estimate(state)
 
-    def _reconstruct_path(self, parent, goal_state):
-        path = []
-        cur = goal_state
-        while True:
-            prev, action = parent.get(cur, (None, None))
-            if prev is None:
-                break
-            path.append(action)
-            cur = prev
-        path.reverse()
-        return path
+    def _priority(self, g, h):
+        return g + h
 
     def solve(self, start_state):
-        player, boxes = start_state
-        start = (player, frozenset(boxes))
+        if self.macros is not None:
+            self.board.reset_macros()
+        start = self.board.pack(start_state)
+        root = self.board.normalize(start) if self.push_mode else start
+        key = self.zobrist.hash(root)
 
+        # Node i was reached from node parents[i] by the encoded actions[i].
         frontier = []
-        g_scores = {start: 0}
-        parent = {start: (None, None)}
+        parents = array("i", [-1])
+        actions = array("i", [0])
+        self.table.clear()
+        self.table.put(key, 0)
 
-        start_f = self.heuristic(start)
-        heapq.heappush(frontier, (start_f, 0, start))
+        start_f = self._priority(0, self.heuristic(root))
+        heapq.heappush(frontier, (start_f, 0, 0, root, key))
 
         while frontier:
-            f, g, state = heapq.heappop(frontier)
+            f, g, node, state, key = heapq.heappop(frontier)
 
-            if g > g_scores.get(state, float("inf")):
+            best_g = self.table.get(key)
+            if best_g is not None and g > best_g:
                 continue
 
             self.expanded += 1
+            if self.progress is not None and not self.expanded % CHECK_EVERY:
+                self.progress.update(self.expanded, len(frontier), self.table.used, f)
 
-            if self.game.is_goal(state):
-                return self._reconstruct_path(parent, state)
+            if self.board.is_goal(state):
+                path = self.board.decode_path(parents, actions, node)
+                return self.board.expand_pushes(start, path) if self.push_mode else path
 
             if self.expanded > self.max_expanded:
                 break
 
-            for succ_raw, action in self.game.get_successors(state):
-                succ_player, succ_boxes_raw = succ_raw
-                succ_boxes = frozenset(succ_boxes_raw)
-                succ = (succ_player, succ_boxes)
-
-                new_g = g + 1
-                if new_g < g_scores.get(succ, float("inf")):
-                    g_scores[succ] = new_g
-                    parent[succ] = (state, action)
-                    new_f = new_g + self.heuristic(succ)
-                    heapq.heappush(frontier, (new_f, new_g, succ))
+            match = self.h.prepare(state)
+            for succ, action in self.successors(state):
+                new_g = g + (len(action) if type(action) is Macro else 1)
+                new_key = self.zobrist.update(key, state, succ)
+                old_g = self.table.get(new_key)
+                if old_g is None or new_g < old_g:
+                    h = self.h.estimate_child(match, state, succ)
+                    if h >= INF:
+                        continue
+                    self.table.put(new_key, new_g)
+                    parents.append(node)
+                    actions.append(self.board.encode_action(action))
+                    heapq.heappush(frontier, (self._priority(new_g, h), new_g, len(actions) - 1, succ, new_key))
 
         return None
@@ -1,31 +1,53 @@
+from array import array
 from collections import deque
 
+from deadlock import DeadlockDetector
+from progress import CHECK_EVERY
+from algorithms.transposition import Zobrist
+
 class BFS:
-    def __init__(self, game):
+    def __init__(self, game, mode="move", deadlocks=False):
         self.game = game
+        self.board = game.board
         self.expanded = 0
-
-    def encode_state(self, state):
-        player, boxes = state
-        return (player, tuple(sorted(boxes)))
+        self.push_mode = mode == "push"
+        self.successors = self.board.push_successors if self.push_mode else self.board.successors
+        self.detector = None
+        if deadlocks:
+            self.detector = DeadlockDetector(self.board)
+            self.successors = self.detector.wrap(self.successors)
+        self.zobrist = Zobrist(self.board)
+        self.progress = None
 
     def solve(self, start_state):
+        start = self.board.pack(start_state)
+        root = self.board.normalize(start) if self.push_mode else start
+        key = self.zobrist.hash(root)
+
+        # Node i was reached from node parents[i] by the encoded actions[i].
+        parents = array("i", [-1])
+        actions = array("i", [0])
         frontier = deque()
-        frontier.append((start_state, []))
-        explored = set()
-        explored.add(self.encode_state(start_state))
+        frontier.append((root, key, 0, 0))
+        # Exact closed set: a lost entry would let BFS revisit states forever.
+        visited = {key}
 
         while frontier:
-            state, path = frontier.popleft()
+            state, key, node, depth = frontier.popleft()
             self.expanded += 1
+            if self.progress is not None and not self.expanded % CHECK_EVERY:
+                self.progress.update(self.expanded, len(frontier), len(visited), depth)
 
-            if self.game.is_goal(state):
-                return path
+            if self.board.is_goal(state):
+                path = self.board.decode_path(parents, actions, node)
+                return self.board.expand_pushes(start, path) if self.push_mode else path
 
-            for new_state, action in self.game.get_successors(state):
-                encoded = self.encode_state(new_state)
-                if encoded not in explored:
-                    explored.add(encoded)
-                    frontier.append((new_state, path + [action]))
+            for new_state, action in self.successors(state):
+                new_key = self.zobrist.update(key, state, new_state)
+                if new_key not in visited:
+                    visited.add(new_key)
+                    parents.append(node)
+                    actions.append(self.board.encode_action(action))
+                    frontier.append((new_state, new_key, len(parents) - 1, depth + 1))
 
-        return None
\ No newline at end of file
+        return None
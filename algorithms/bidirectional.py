@@ -0,0 +1,123 @@
+from array import array
+
+from bitboard import iter_bits
+from deadlock import DeadlockDetector
+from progress import CHECK_EVERY
+
+OPPOSITE = {"U": "D", "D": "U", "L": "R", "R": "L"}
+
+
+class _Side:
+    # Visited states of one direction. Node i is seen[state] and was reached
+    # from node parents[i] by the encoded push actions[i].
+
+    def __init__(self, roots):
+        self.seen = {}
+        self.parents = array("i")
+        self.actions = array("i")
+        for state in roots:
+            if state not in self.seen:
+                self.seen[state] = len(self.parents)
+                self.parents.append(-1)
+                self.actions.append(0)
+        self.frontier = list(self.seen)
+        self.depth = 0
+
+
+class Bidirectional:
+    # Breadth-first over pushes from the start and over pulls from the
+    # solved position at the same time, one layer at a time on whichever
+    # side has the smaller frontier. A pull is a push played backwards, so
+    # the first state reached from both sides joins the two halves into a
+    # solution with the fewest pushes. The search is always over pushes;
+    # `mode` is only accepted to match the other solvers.
+
+    def __init__(self, game, mode="push", deadlocks=False):
+        self.game = game
+        self.board = game.board
+        self.expanded = 0
+        self.successors = self.board.push_successors
+        self.detector = None
+        if deadlocks:
+            self.detector = DeadlockDetector(self.board)
+            self.successors = self.detector.wrap(self.successors)
+        self.progress = None
+
+    def goal_states(self):
+        # Boxes on every goal, player normalized in each region left free.
+        boxes = self.board.goal_mask
+        free = self.board.floor & ~boxes
+        states = []
+        while free:
+            player = (free & -free).bit_length() - 1
+            states.append((player, boxes))
+            free &= ~self.board.reachable(player, boxes)
+        return states
+
+    def pull_successors(self, state):
+        # The player steps back from a box at b and drags it one cell. The
+        # action stored is the push that undoes the pull.
+        player, boxes = state
+        region = self.board.region(state)
+        free = self.board.floor & ~boxes
+        successors = []
+        for b in iter_bits(boxes):
+            for action, d in self.board.moves:
+                p = b + d
+                if not region >> p & 1 or not free >> (p + d) & 1:
+                    continue
+                new_boxes = boxes ^ (1 << b) ^ (1 << p)
+                # The box now stands where the player was, so the region
+                # is filled again rather than grown.
+                new_region = self.board.reachable(p + d, new_boxes)
+                new_state = ((new_region & -new_region).bit_length() - 1, new_boxes)
+                self.board.remember_region(new_state, new_region)
+                successors.append((new_state, (p, OPPOSITE[action])))
+        return successors
+
+    def _expand_layer(self, side, other, successors):
+        # Returns the first state of the new layer that the other side has
+        # already seen. Every meeting found in a layer gives a solution of
+        # the same length, so the first one is optimal.
+        frontier = []
+        for state in side.frontier:
+            node = side.seen[state]
+            self.expanded += 1
+            if self.progress is not None and not self.expanded % CHECK_EVERY:
+                self.progress.update(self.expanded, len(side.frontier) + len(other.frontier),
+                                     len(side.seen) + len(other.seen), side.depth + other.depth)
+            for child, action in successors(state):
+                if child in side.seen:
+                    continue
+                side.seen[child] = len(side.parents)
+                side.parents.append(node)
+                side.actions.append(self.board.encode_action(action))
+                if child in other.seen:
+                    return child
+                frontier.append(child)
+        side.frontier = frontier
+        side.depth += 1
+        return None
+
+    def solve(self, start_state):
+        start = self.board.pack(start_state)
+        root = self.board.normalize(start)
+        if self.board.is_goal(root):
+            return []
+        if bin(self.board.goal_mask).count("1") != bin(root[1]).count("1"):
+            # The solved position is only known when boxes and goals match.
+            return None
+
+        forward = _Side([root])
+        backward = _Side(self.goal_states())
+        while forward.frontier and backward.frontier:
+            if len(forward.frontier) <= len(backward.frontier):
+                meet = self._expand_layer(forward, backward, self.successors)
+            else:
+                meet = self._expand_layer(backward, forward, self.pull_successors)
+            if meet is not None:
+                pushes = self.board.decode_path(forward.parents, forward.actions, forward.seen[meet])
+                back = self.board.decode_path(backward.parents, backward.actions, backward.seen[meet])
+                pushes.extend(reversed(back))
+                return self.board.expand_pushes(start, pushes)
+        return None
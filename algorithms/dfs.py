@@ -1,29 +1,50 @@
+from array import array
+
+from deadlock import DeadlockDetector
+from progress import CHECK_EVERY
+from algorithms.transposition import Zobrist
+
 class DFS:
-    def __init__(self, game):
+    def __init__(self, game, mode="move", deadlocks=False):
         self.game = game
+        self.board = game.board
         self.expanded = 0
-
-    def encode_state(self, state):
-        player, boxes = state
-        return (player, tuple(sorted(boxes)))
+        self.push_mode = mode == "push"
+        self.successors = self.board.push_successors if self.push_mode else self.board.successors
+        self.detector = None
+        if deadlocks:
+            self.detector = DeadlockDetector(self.board)
+            self.successors = self.detector.wrap(self.successors)
+        self.zobrist = Zobrist(self.board)
+        self.progress = None
 
     def solve(self, start_state, max_depth=200):
-        stack = [(start_state, [])]
-        explored = set()
+        start = self.board.pack(start_state)
+        root = self.board.normalize(start) if self.push_mode else start
+
+        # Node i was reached from node parents[i] by the encoded actions[i].
+        parents = array("i", [-1])
+        actions = array("i", [0])
+        stack = [(root, self.zobrist.hash(root), 0, 0)]
+        visited = set()
 
         while stack:
-            state, path = stack.pop()
+            state, key, node, depth = stack.pop()
             self.expanded += 1
+            if self.progress is not None and not self.expanded % CHECK_EVERY:
+                self.progress.update(self.expanded, len(stack), len(visited), depth)
 
-            if self.game.is_goal(state):
-                return path
+            if self.board.is_goal(state):
+                path = self.board.decode_path(parents, actions, node)
+                return self.board.expand_pushes(start, path) if self.push_mode else path
 
-            encoded = self.encode_state(state)
-            if encoded in explored or len(path) > max_depth:
+            if key in visited or depth > max_depth:
                 continue
-            explored.add(encoded)
+            visited.add(key)
 
-            for new_state, action in self.game.get_successors(state):
-                stack.append((new_state, path + [action]))
+            for new_state, action in self.successors(state):
+                parents.append(node)
+                actions.append(self.board.encode_action(action))
+                stack.append((new_state, self.zobrist.update(key, state, new_state), len(parents) - 1, depth + 1))
 
-        return None
\ No newline at end of file
+        return None
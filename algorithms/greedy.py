@@ -0,0 +1,8 @@
+from algorithms.astar import AStar
+
+class GreedyBestFirst(AStar):
+    # Orders the frontier by h alone. Usually finds a solution much faster
+    # than A*, but it is not optimal.
+
+    def _priority(self, g, h):
+        return h
@@ -0,0 +1,143 @@
+import preprocess
+from bitboard import iter_bits
+
+INF = 1 << 30
+
+
+class ZeroHeuristic:
+    # Turns IDA* into plain iterative deepening.
+
+    def __init__(self, board):
+        self.board = board
+
+    def estimate(self, state):
+        return 0
+
+    def prepare(self, state):
+        return 0
+
+    def estimate_child(self, h, state, child):
+        return 0
+
+
+class ManhattanHeuristic:
+    # Sum over boxes of the Manhattan distance to the nearest goal.
+
+    def __init__(self, board):
+        self.board = board
+        self.goal_dist = preprocess.manhattan_table(board)
+
+    def estimate(self, state):
+        goal_dist = self.goal_dist
+        return sum(goal_dist[i] for i in iter_bits(state[1]))
+
+    def prepare(self, state):
+        return self.estimate(state)
+
+    def estimate_child(self, h, state, child):
+        moved = child[1] & ~state[1]
+        if not moved:
+            return h
+        old = (state[1] & ~child[1]).bit_length() - 1
+        return h - self.goal_dist[old] + self.goal_dist[moved.bit_length() - 1]
+
+
+class MatchingHeuristic:
+    # Minimum-cost perfect matching of boxes to goals (Hungarian method)
+    # over true push distances. Every box needs its own goal and at least
+    # that many pushes, so the bound stays admissible. estimate_child
+    # re-matches only the moved box, in O(n^2) instead of O(n^3).
+
+    def __init__(self, board):
+        self.board = board
+        distances = board.push_distances()
+        self.goal_count = len(distances)
+        self.rows = preprocess.goal_cost_rows(board, distances, INF)
+
+    def estimate(self, state):
+        return self.prepare(state)[0]
+
+    def prepare(self, state):
+        boxes = list(iter_bits(state[1]))
+        cost = [self.rows[b] for b in boxes]
+        n, m = len(cost), self.goal_count
+        if n > m:
+            return (INF, boxes, cost, None, None, None)
+        u, v, p = [0] * (n + 1), [0] * (m + 1), [0] * (m + 1)
+        for i in range(1, n + 1):
+            self._assign_row(i, cost, u, v, p)
+        return (self._total(cost, p), boxes, cost, u, v, p)
+
+    def estimate_child(self, match, state, child):
+        h, boxes, cost, u, v, p = match
+        moved = child[1] & ~state[1]
+        if not moved or u is None:
+            return h
+        n, m = len(boxes), self.goal_count
+        if n < m:
+            return self.estimate(child)
+
+        old = (state[1] & ~child[1]).bit_length() - 1
+        r = boxes.index(old) + 1
+        cost = list(cost)
+        cost[r - 1] = row = self.rows[moved.bit_length() - 1]
+        u, v, p = list(u), list(v), list(p)
+        p[p.index(r, 1)] = 0
+        u[r] = min(row[j - 1] - v[j] for j in range(1, m + 1))
+        self._assign_row(r, cost, u, v, p)
+        return self._total(cost, p)
+
+    def _total(self, cost, p):
+        total = 0
+        for j in range(1, len(p)):
+            if p[j]:
+                total += cost[p[j] - 1][j - 1]
+        return min(total, INF)
+
+    def _assign_row(self, i, cost, u, v, p):
+        m = len(v) - 1
+        minv = [INF * 2] * (m + 1)
+        used = [False] * (m + 1)
+        way = [0] * (m + 1)
+        p[0] = i
+        j0 = 0
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = INF * 2
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - ui0 - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+
+HEURISTICS = {
+    "none": ZeroHeuristic,
+    "manhattan": ManhattanHeuristic,
+    "matching": MatchingHeuristic,
+}
+
+
+def make_heuristic(name, board):
+    return HEURISTICS[name](board)
@@ -0,0 +1,94 @@
+from deadlock import DeadlockDetector
+from progress import CHECK_EVERY
+from algorithms.heuristics import INF, make_heuristic
+from algorithms.transposition import TranspositionTable, Zobrist
+
+class IDAStar:
+    # Depth-first searches with a growing f = g + h bound. Only the current
+    # path and its sibling lists are kept, plus a small transposition table
+    # (cleared every iteration) that skips states already reached with a
+    # g no larger than the current one.
+
+    def __init__(self, game, mode="move", deadlocks=False, heuristic="matching",
+                 table_mb=4, table_policy="shallow"):
+        self.game = game
+        self.board = game.board
+        self.expanded = 0
+        self.iterations = 0
+        self.push_mode = mode == "push"
+        self.successors = self.board.push_successors if self.push_mode else self.board.successors
+        self.detector = None
+        if deadlocks:
+            self.detector = DeadlockDetector(self.board)
+            self.successors = self.detector.wrap(self.successors)
+        self.h = make_heuristic(heuristic, self.board)
+        self.zobrist = Zobrist(self.board)
+        self.table = TranspositionTable(table_mb, table_policy)
+        self.progress = None
+
+    def heuristic(self, state):
+        return self.h.estimate(state)
+
+    def _expand(self, state, key, g):
+        self.expanded += 1
+        match = self.h.prepare(state)
+        children = []
+        for succ, action in self.successors(state):
+            h = self.h.estimate_child(match, state, succ)
+            if h >= INF:
+                continue
+            children.append((g + 1 + h, succ, self.zobrist.update(key, state, succ), action))
+        children.sort(key=lambda child: child[0])
+        return [g, children, 0]
+
+    def _search(self, root, key, bound):
+        path = []
+        next_bound = INF
+        self.table.clear()
+        self.table.put(key, 0)
+        frames = [self._expand(root, key, 0)]
+
+        while frames:
+            frame = frames[-1]
+            g, children, i = frame
+            if i == len(children):
+                frames.pop()
+                if path:
+                    path.pop()
+                continue
+            frame[2] = i + 1
+
+            f, child, child_key, action = children[i]
+            if f > bound:
+                next_bound = min(next_bound, f)
+                frame[2] = len(children)
+                continue
+            if self.board.is_goal(child):
+                path.append(action)
+                return path, bound
+
+            seen = self.table.get(child_key)
+            if seen is not None and seen <= g + 1:
+                continue
+            self.table.put(child_key, g + 1)
+            path.append(action)
+            frames.append(self._expand(child, child_key, g + 1))
+            if self.progress is not None and not self.expanded % CHECK_EVERY:
+                self.progress.update(self.expanded, len(frames), self.table.used, bound)
+
+        return None, next_bound
+
+    def solve(self, start_state):
+        start = self.board.pack(start_state)
+        root = self.board.normalize(start) if self.push_mode else start
+        if self.board.is_goal(root):
+            return []
+
+        key = self.zobrist.hash(root)
+        bound = self.heuristic(root)
+        while bound < INF:
+            self.iterations += 1
+            path, bound = self._search(root, key, bound)
+            if path is not None:
+                return self.board.expand_pushes(start, path) if self.push_mode else path
+        return None
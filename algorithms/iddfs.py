@@ -0,0 +1,9 @@
+from algorithms.idastar import IDAStar
+
+class IDDFS(IDAStar):
+    # Iterative deepening DFS: IDA* with a zero heuristic, so the bound is
+    # the depth limit and grows by one each iteration.
+
+    def __init__(self, game, mode="move", deadlocks=False, table_mb=4, table_policy="shallow"):
+        super().__init__(game, mode=mode, deadlocks=deadlocks, heuristic="none",
+                         table_mb=table_mb, table_policy=table_policy)
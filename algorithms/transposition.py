@@ -0,0 +1,160 @@
+import random
+from array import array
+
+from bitboard import iter_bits
+
+
+class Zobrist:
+    # 64-bit Zobrist keys: one random word per (cell, box) and per
+    # (cell, player). A push changes one box and the player, so a child's
+    # key is its parent's key with four words xor-ed in.
+
+    def __init__(self, board, seed=0x50C0BA4):
+        rng = random.Random(seed)
+        self.box_keys = [rng.getrandbits(64) for _ in range(board.size)]
+        self.player_keys = [rng.getrandbits(64) for _ in range(board.size)]
+
+    def hash(self, state):
+        player, boxes = state
+        h = self.player_keys[player]
+        for i in iter_bits(boxes):
+            h ^= self.box_keys[i]
+        return h
+
+    def update(self, h, state, child):
+        h ^= self.player_keys[state[0]] ^ self.player_keys[child[0]]
+        moved = child[1] & ~state[1]
+        if moved:
+            old = (state[1] & ~child[1]).bit_length() - 1
+            h ^= self.box_keys[old] ^ self.box_keys[moved.bit_length() - 1]
+        return h
+
+
+class TranspositionTable:
+    # Open addressing over a short run of slots, each holding a 64-bit key
+    # and a 32-bit value (search depth or g). The table starts small and
+    # doubles whenever a quarter of its slots are used, so nothing is lost
+    # until it reaches the memory budget. A full table is lossy: when all
+    # PROBES slots of a key are taken the policy decides who stays:
+    #   "always"  - the new entry replaces the one in the key's first slot
+    #   "shallow" - the entry with the largest value is replaced, unless
+    #               the new value is larger still (small values prune
+    #               more of the search below them)
+    ENTRY_BYTES = 12
+    INITIAL_SLOTS = 1 << 14
+    PROBES = 4
+    POLICIES = ("always", "shallow")
+
+    def __init__(self, memory_mb=16, policy="shallow"):
+        if policy not in self.POLICIES:
+            raise ValueError("Unknown replacement policy: %s" % policy)
+        self.max_capacity = max(1, int(memory_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self.policy = policy
+        self.lookups = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+        self.clear()
+
+    def clear(self):
+        self._allocate(min(self.INITIAL_SLOTS, self.max_capacity))
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.keys = array("Q", bytes(8 * capacity))
+        self.values = array("i", bytes(4 * capacity))
+        self.used = 0
+
+    def _grow(self):
+        keys, values = self.keys, self.values
+        self._allocate(min(2 * self.capacity, self.max_capacity))
+        for key, value in zip(keys, values):
+            if key:
+                self._store(key, value)
+
+    def _store(self, key, value):
+        # Returns False when the entry was not stored (shallow policy).
+        keys, values, capacity = self.keys, self.values, self.capacity
+        home = key % capacity
+        victim = home
+        for j in range(self.PROBES):
+            i = (home + j) % capacity
+            stored = keys[i]
+            if stored == key:
+                values[i] = value
+                return True
+            if stored == 0:
+                keys[i] = key
+                values[i] = value
+                self.used += 1
+                return True
+            if values[i] > values[victim]:
+                victim = i
+        if self.policy == "always":
+            victim = home
+        elif values[victim] < value:
+            return False
+        keys[victim] = key
+        values[victim] = value
+        self.replacements += 1
+        return True
+
+    def get(self, key):
+        key = key or 1
+        keys, capacity = self.keys, self.capacity
+        home = key % capacity
+        self.lookups += 1
+        for j in range(self.PROBES):
+            i = (home + j) % capacity
+            stored = keys[i]
+            if stored == key:
+                self.hits += 1
+                return self.values[i]
+            if stored == 0:
+                break
+        if keys[home]:
+            self.collisions += 1
+        return None
+
+    def put(self, key, value):
+        if not self._store(key or 1, value):
+            return False
+        self.stores += 1
+        if 4 * self.used > self.capacity and self.capacity < self.max_capacity:
+            self._grow()
+        return True
+
+    def stats(self):
+        lookups = self.lookups or 1
+        return {
+            "capacity": self.capacity,
+            "used": self.used,
+            "lookups": self.lookups,
+            "hit_rate": self.hits / lookups,
+            "collision_rate": self.collisions / lookups,
+            "stores": self.stores,
+            "replacements": self.replacements,
+        }
+
+    def report(self):
+        s = self.stats()
+        return ("slots %d/%d | lookups %d | hit rate %.2f%% | collision rate %.2f%% | replacements %d"
+                % (s["used"], s["capacity"], s["lookups"], 100 * s["hit_rate"],
+                   100 * s["collision_rate"], s["replacements"]))
+
+
+class ExactTable(dict):
+    # g-values in a plain dict, for solvers that must not lose entries.
+    # Same get/put/report interface as TranspositionTable.
+
+    def put(self, key, value):
+        self[key] = value
+        return True
+
+    @property
+    def used(self):
+        return len(self)
+
+    def report(self):
+        return "exact | entries %d" % len(self)
@@ -0,0 +1,215 @@
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from profiling import MODES as PROFILE_MODES
+from progress import peak_rss_mb
+from runner import CSV_HEADER, load_level, result_row, solve
+from solution_cache import CACHE_FILE, SolutionCache
+from worker_pool import SolverPool
+from xsb import LevelIndex
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+BENCHMARK_HEADER = CSV_HEADER + ["status", "peak_rss_mb", "states_per_sec"]
+DEFAULT_ALGOS = ["BFS", "A*", "BFS (push)", "A* (push)", "IDA* (push)"]
+
+
+def benchmark_job(job_id, level_name, algo_name, memory_mb, cache_file, progress_file, profile, result_queue):
+    if resource is not None and memory_mb:
+        limit = int(memory_mb * 1024 * 1024)
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except Exception:
+            pass
+    try:
+        cache = SolutionCache(cache_file) if cache_file else None
+        result = solve(level_name, algo_name, cache, progress_file, profile)
+        status = "ok" if result["solution"] is not None else "unsolved"
+        result_queue.put((job_id, level_name, algo_name, status, result["solution"], result["expanded"],
+                          result["time_sec"], peak_rss_mb()))
+    except MemoryError:
+        result_queue.put((job_id, level_name, algo_name, "memory", None, 0, 0.0, peak_rss_mb()))
+    except Exception as e:
+        print("Error in benchmark job", level_name, algo_name, ":", e)
+        result_queue.put((job_id, level_name, algo_name, "error", None, 0, 0.0, peak_rss_mb()))
+
+
+def collect_levels(paths):
+    # Level names as understood by runner.load_level: .tmx paths, or
+    # "file#id" for levels of a text collection (read straight from the
+    # file through its offset index, no TMX round-trip).
+    levels = []
+    for path in paths:
+        if os.path.isdir(path):
+            levels.extend(sorted(glob.glob(os.path.join(path, "*.tmx"))))
+        elif path.lower().endswith(".tmx"):
+            levels.append(path)
+        else:
+            levels.extend("%s#%s" % (path, level_id) for level_id in LevelIndex(path).ids())
+    return levels
+
+
+def run_benchmark(levels, algo_names, workers=None, timeout=900, memory_mb=None, cache_file=None,
+                  progress_file=None, profile=None, pool=False):
+    # Runs every (level, solver) pair in its own process, at most `workers`
+    # at a time, killing any job that goes over `timeout` seconds. With a
+    # solution cache, pairs already in it are reported from the cache
+    # without running and new solutions are added to it.
+    workers = workers or os.cpu_count() or 1
+    jobs = [(level, algo) for level in levels for algo in algo_names]
+    result_queue = multiprocessing.Queue()
+    # job id -> (process, start time, level, solver); the same pair may be
+    # listed more than once.
+    running = {}
+    next_id = 0
+    rows = []
+
+    def record(level_name, algo_name, status, solution, expanded, time_sec, rss):
+        rate = round(expanded / time_sec, 1) if time_sec > 0 else 0.0
+        row = result_row(level_name, algo_name, time_sec, solution, expanded) + [status, rss, rate]
+        rows.append(row)
+        print("%-30s %-16s %-9s time %8.3fs  steps %5d  expanded %9d  rss %7.1f MB"
+              % (level_name, algo_name, status, time_sec, row[3], expanded, rss))
+
+    if cache_file:
+        cache = SolutionCache(cache_file)
+        pending = []
+        for level_name, algo_name in jobs:
+            hit = cache.get(load_level(level_name), algo_name)
+            if hit is None:
+                pending.append((level_name, algo_name))
+            else:
+                record(level_name, algo_name, "cached", hit["solution"], hit["expanded"], hit["time_sec"], 0.0)
+        cache.close()
+        jobs = pending
+
+    if pool:
+        # Warm workers that keep levels loaded between jobs. Cheaper for
+        # many short solves, but jobs share processes, so there is no
+        # per-job memory limit, progress file or profile.
+        with SolverPool(workers) as solver_pool:
+            for r in solver_pool.map(jobs, timeout):
+                record(r["map"], r["algo"], r["status"], r["solution"], r["expanded"], r["time_sec"],
+                       r["peak_rss_mb"])
+        return rows
+
+    while jobs or running:
+        while jobs and len(running) < workers:
+            level_name, algo_name = jobs.pop(0)
+            next_id += 1
+            p = multiprocessing.Process(target=benchmark_job,
+                                        args=(next_id, level_name, algo_name, memory_mb, cache_file,
+                                              progress_file, profile, result_queue))
+            p.start()
+            running[next_id] = (p, time.time(), level_name, algo_name)
+
+        # Every queued result is read before the limits below are checked,
+        # so a job that already reported is never counted as a timeout.
+        # Results of jobs that were stopped meanwhile are dropped.
+        results = []
+        try:
+            results.append(result_queue.get(timeout=0.2))
+            while True:
+                results.append(result_queue.get_nowait())
+        except queue.Empty:
+            pass
+        for result in results:
+            job = running.pop(result[0], None)
+            if job is None:
+                continue
+            job[0].join()
+            record(*result[1:])
+
+        now = time.time()
+        for job_id, (p, started, level_name, algo_name) in list(running.items()):
+            if now - started > timeout:
+                p.terminate()
+                p.join()
+                del running[job_id]
+                record(level_name, algo_name, "timeout", None, 0, round(now - started, 4), 0.0)
+            elif not p.is_alive() and p.exitcode not in (0, None):
+                del running[job_id]
+                record(level_name, algo_name, "crashed", None, 0, round(now - started, 4), 0.0)
+
+    return rows
+
+
+def write_rows(rows, csv_file):
+    write_header = not os.path.exists(csv_file)
+    with open(csv_file, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(BENCHMARK_HEADER)
+        writer.writerows(rows)
+
+
+def find_regressions(rows, baseline_file, slowdown=1.5, min_time=0.5):
+    # Compares against the last baseline row for each (map, solver) pair.
+    baseline = {}
+    with open(baseline_file, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            baseline[(row["map_name"], row["algo_name"])] = row
+
+    regressions = []
+    for row in rows:
+        old = baseline.get((row[0], row[1]))
+        if old is None:
+            continue
+        if int(old["success"]) and not row[5]:
+            regressions.append((row[0], row[1], "no longer solved"))
+        elif row[5] and float(row[2]) > max(min_time, float(old["time_sec"]) * slowdown):
+            regressions.append((row[0], row[1], "time %.3fs -> %.3fs" % (float(old["time_sec"]), row[2])))
+        elif row[5] and int(row[4]) > int(old["expanded_states"]) * slowdown:
+            regressions.append((row[0], row[1], "expanded %s -> %d" % (old["expanded_states"], row[4])))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every solver on every level, headless.")
+    parser.add_argument("levels", nargs="+",
+                        help=".tmx files, directories of .tmx files, or XSB / dataset.txt-style level files")
+    parser.add_argument("--algos", default=",".join(DEFAULT_ALGOS),
+                        help="comma-separated solver names as shown in the menu")
+    parser.add_argument("--workers", type=int, default=None, help="parallel jobs (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds per job")
+    parser.add_argument("--memory-mb", type=float, default=None, help="address space limit per job")
+    parser.add_argument("--output", default="benchmark_results.csv")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="skip pairs already in %s and store new solutions there" % CACHE_FILE)
+    parser.add_argument("--progress", default=None,
+                        help="append live search progress of every job to this JSON-lines file")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="time the search phases (and optionally run cProfile); "
+                             "summary in profile_results.csv / profile_report.txt")
+    parser.add_argument("--pool", action="store_true",
+                        help="run jobs on long-lived workers that keep levels loaded")
+    parser.add_argument("--baseline", default=None,
+                        help="earlier results CSV; exit with status 1 if any job got worse")
+    args = parser.parse_args()
+
+    algo_names = [name.strip() for name in args.algos.split(",") if name.strip()]
+    levels = collect_levels(args.levels)
+    rows = run_benchmark(levels, algo_names, args.workers, args.timeout, args.memory_mb,
+                         CACHE_FILE if args.use_cache else None, args.progress, args.profile,
+                         args.pool)
+
+    regressions = find_regressions(rows, args.baseline) if args.baseline else []
+    write_rows(rows, args.output)
+    print("Wrote %d results to %s" % (len(rows), args.output))
+    for map_path, algo_name, reason in regressions:
+        print("REGRESSION:", map_path, algo_name, "-", reason)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
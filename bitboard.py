@@ -0,0 +1,274 @@
+from collections import deque
+
+import preprocess
+
+MOVES = (("U", 0, -1), ("D", 0, 1), ("L", -1, 0), ("R", 1, 0))
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Macro(tuple):
+    # Several pushes taken as one search step, as a tuple of (box, move)
+    # pushes. It costs len(macro) pushes.
+    pass
+
+
+class Bitboard:
+    # Cells are numbered row by row on the map padded with one ring of wall,
+    # so a neighbour is always index +/- 1 or +/- stride and never off-board.
+    # A packed state is (player_index, box_mask) where box_mask is an int
+    # with one bit per box cell. In push mode the player index is normalized
+    # to the top-left-most cell of the region the player can walk to.
+
+    def __init__(self, game_map, goals, tables=None):
+        self.height = len(game_map)
+        self.width = max((len(row) for row in game_map), default=0)
+        self.stride = self.width + 2
+        self.size = self.stride * (self.height + 2)
+        self.moves = tuple((action, dy * self.stride + dx) for action, dx, dy in MOVES)
+        self.action_index = {action: k for k, (action, _, _) in enumerate(MOVES)}
+        self.reset_macros()
+        # Player regions of recently generated states, so the deadlock
+        # checks on a child and its own expansion later don't flood fill
+        # again. Cleared when full.
+        self.regions = {}
+        self.region_cache_size = 100000
+
+        if tables is not None:
+            # Precomputed by level_cache, nothing left to derive.
+            self.floor = tables["floor"]
+            self.goal_mask = tables["goal_mask"]
+            self.dead = tables["dead"]
+            self.distances = tables["distances"]
+            return
+
+        self.floor = preprocess.floor_mask(self, game_map)
+
+        self.goal_mask = 0
+        for (gx, gy) in goals:
+            self.goal_mask |= 1 << self.index(gx, gy)
+
+        self.dead = preprocess.dead_mask(self)
+        self.distances = None
+
+    def index(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+    def coords(self, i):
+        y, x = divmod(i, self.stride)
+        return (x - 1, y - 1)
+
+    def pack(self, state):
+        player, boxes = state
+        mask = 0
+        for (bx, by) in boxes:
+            mask |= 1 << self.index(bx, by)
+        return (self.index(*player), mask)
+
+    def unpack(self, state):
+        player, boxes = state
+        return (self.coords(player), tuple(self.coords(i) for i in iter_bits(boxes)))
+
+    def is_floor(self, i):
+        return self.floor >> i & 1
+
+    def is_goal(self, state):
+        return state[1] & ~self.goal_mask == 0
+
+    def push_distances(self):
+        # One table per goal, in goal index order.
+        if self.distances is None:
+            self.distances = preprocess.push_distance_tables(self)
+        return self.distances
+
+    def all_boxes_blocked(self, boxes):
+        free = self.floor & ~boxes
+        s = self.stride
+        if boxes & (free << 1) & (free >> 1):
+            return False
+        if boxes & (free << s) & (free >> s):
+            return False
+        return True
+
+    def successors(self, state):
+        player, boxes = state
+        successors = []
+        for action, d in self.moves:
+            n = player + d
+            bit = 1 << n
+            if not self.floor & bit:
+                continue
+
+            new_boxes = boxes
+            if boxes & bit:
+                b = n + d
+                bbit = 1 << b
+                if not self.floor & bbit or boxes & bbit:
+                    continue
+                if self.dead & bbit:
+                    continue
+                new_boxes = boxes ^ bit ^ bbit
+                if new_boxes & ~self.goal_mask and self.all_boxes_blocked(new_boxes):
+                    continue
+
+            successors.append(((n, new_boxes), action))
+        return successors
+
+    def apply(self, state, action):
+        # Plays one move by the game rules only (no deadlock pruning).
+        # Returns None when the move is illegal or not a move at all.
+        player, boxes = state
+        k = self.action_index.get(action)
+        if k is None:
+            return None
+        d = self.moves[k][1]
+        n = player + d
+        if not self.floor >> n & 1:
+            return None
+        if boxes >> n & 1:
+            b = n + d
+            if not self.floor >> b & 1 or boxes >> b & 1:
+                return None
+            boxes = boxes ^ (1 << n) ^ (1 << b)
+        return (n, boxes)
+
+    def reachable(self, player, boxes, seed=0):
+        # `seed` may hold cells already known to be in the region, so only
+        # the part around them that is new gets filled.
+        free = self.floor & ~boxes
+        s = self.stride
+        region = seed | 1 << player
+        while True:
+            grown = (region | region << 1 | region >> 1 | region << s | region >> s) & free
+            if grown == region:
+                return region
+            region = grown
+
+    def region(self, state):
+        region = self.regions.get(state)
+        if region is None:
+            region = self.reachable(*state)
+            self.remember_region(state, region)
+        return region
+
+    def remember_region(self, state, region):
+        if len(self.regions) >= self.region_cache_size:
+            self.regions.clear()
+        self.regions[state] = region
+
+    def pushed_region(self, region, b, d, new_boxes):
+        # Region after the box on b is pushed to b + d by a player in
+        # `region`. If b + d wasn't part of the region, every cell of it is
+        # still free and connected to b, so the fill only has to grow it.
+        # Otherwise the box may have cut the region in two.
+        if region >> (b + d) & 1:
+            return self.reachable(b, new_boxes)
+        return self.reachable(b, new_boxes, region)
+
+    def normalize(self, state):
+        player, boxes = state
+        region = self.reachable(player, boxes)
+        return ((region & -region).bit_length() - 1, boxes)
+
+    def push_successors(self, state):
+        player, boxes = state
+        region = self.region(state)
+        free = self.floor & ~boxes
+        successors = []
+        # A box drawn on a wall (some TMX maps do that) can't be pushed.
+        for b in iter_bits(boxes & self.floor):
+            bit = 1 << b
+            for action, d in self.moves:
+                if not region >> (b - d) & 1:
+                    continue
+                target = 1 << (b + d)
+                if not free & target or self.dead & target:
+                    continue
+                new_boxes = boxes ^ bit ^ target
+                if new_boxes & ~self.goal_mask and self.all_boxes_blocked(new_boxes):
+                    continue
+                new_region = self.pushed_region(region, b, d, new_boxes)
+                new_state = ((new_region & -new_region).bit_length() - 1, new_boxes)
+                self.remember_region(new_state, new_region)
+                successors.append((new_state, (b, action)))
+        return successors
+
+    def walk(self, start, target, boxes):
+        if start == target:
+            return []
+        free = self.floor & ~boxes
+        parent = {start: None}
+        q = deque([start])
+        while q:
+            i = q.popleft()
+            for action, d in self.moves:
+                n = i + d
+                if n in parent or not free >> n & 1:
+                    continue
+                parent[n] = (i, action)
+                if n == target:
+                    path = []
+                    while parent[n] is not None:
+                        n, action = parent[n]
+                        path.append(action)
+                    path.reverse()
+                    return path
+                q.append(n)
+        return None
+
+    def encode_action(self, action):
+        # Moves become 0-3, pushes (box, move) become ((box + 1) << 2) | move
+        # and macros negative indexes into self.macros, so a solver can keep
+        # its actions in an int array.
+        if isinstance(action, str):
+            return self.action_index[action]
+        if isinstance(action, Macro):
+            code = self.macro_codes.get(action)
+            if code is None:
+                self.macros.append(action)
+                code = self.macro_codes[action] = -len(self.macros)
+            return code
+        b, move = action
+        return (b + 1) << 2 | self.action_index[move]
+
+    def reset_macros(self):
+        # Macro codes only mean something within one search. Boards stay
+        # loaded across jobs in the worker pool, so each search starts over.
+        self.macros = []
+        self.macro_codes = {}
+
+    def decode_action(self, code):
+        if code < 0:
+            return self.macros[-code - 1]
+        move = MOVES[code & 3][0]
+        if code < 4:
+            return move
+        return ((code >> 2) - 1, move)
+
+    def decode_path(self, parents, actions, node):
+        # Actions from the root to `node`, where node i was reached from
+        # node parents[i] (-1 for the root) by the encoded actions[i].
+        path = []
+        while parents[node] >= 0:
+            path.append(self.decode_action(actions[node]))
+            node = parents[node]
+        path.reverse()
+        return path
+
+    def expand_pushes(self, start, pushes):
+        player, boxes = start
+        offsets = dict(self.moves)
+        moves = []
+        for push in pushes:
+            for b, action in (push if isinstance(push, Macro) else (push,)):
+                d = offsets[action]
+                moves.extend(self.walk(player, b - d, boxes))
+                moves.append(action)
+                boxes = boxes ^ (1 << b) ^ (1 << (b + d))
+                player = b
+        return moves
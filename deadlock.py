@@ -0,0 +1,201 @@
+from collections import deque
+
+
+def dead_squares(board):
+    # A box can reach a goal from cell c iff c is reached when boxes are
+    # pulled backwards from that goal: pulling a box from c to c + d needs
+    # the player to stand on c + d and step back to c + 2d.
+    live = set()
+    q = deque()
+    goal_mask = board.goal_mask
+    while goal_mask:
+        low = goal_mask & -goal_mask
+        g = low.bit_length() - 1
+        goal_mask ^= low
+        live.add(g)
+        q.append(g)
+
+    while q:
+        c = q.popleft()
+        for _, d in board.moves:
+            n = c + d
+            if n in live:
+                continue
+            if board.is_floor(n) and board.is_floor(n + d):
+                live.add(n)
+                q.append(n)
+
+    dead = board.floor
+    for c in live:
+        dead &= ~(1 << c)
+    return dead
+
+
+def pull_distances(board, goal):
+    # Fewest pushes to bring a box from each cell to goal, ignoring the
+    # other boxes; -1 where the goal can't be reached.
+    dist = [-1] * board.size
+    dist[goal] = 0
+    q = deque([goal])
+    while q:
+        c = q.popleft()
+        for _, d in board.moves:
+            n = c + d
+            if dist[n] < 0 and board.is_floor(n) and board.is_floor(n + d):
+                dist[n] = dist[c] + 1
+                q.append(n)
+    return dist
+
+
+class DeadlockDetector:
+    # Checks only the box that was just pushed: 2x2 blocks, freeze
+    # deadlocks and PI-corral deadlocks. Wrap a successor function with
+    # wrap() to drop deadlocked children.
+
+    def __init__(self, board, corral=True, corral_limit=500, cache_size=100000):
+        self.board = board
+        self.corral = corral
+        self.corral_limit = corral_limit
+        self.cache_size = cache_size
+        self.corral_cache = {}
+        self.pruned = 0
+
+    def wrap(self, successors):
+        def filtered(state):
+            result = []
+            for succ in successors(state):
+                new_state = succ[0]
+                moved = new_state[1] & ~state[1]
+                if moved and self.is_deadlock(new_state, moved.bit_length() - 1):
+                    self.pruned += 1
+                    continue
+                result.append(succ)
+            return result
+        return filtered
+
+    def is_deadlock(self, state, box):
+        boxes = state[1]
+        if self.block_deadlock(boxes, box):
+            return True
+        if self.freeze_deadlock(boxes, box):
+            return True
+        if self.corral and self.corral_deadlock(state, box):
+            return True
+        return False
+
+    def _blocked(self, boxes, i):
+        return not self.board.floor >> i & 1 or boxes >> i & 1
+
+    def block_deadlock(self, boxes, box):
+        s = self.board.stride
+        goal_mask = self.board.goal_mask
+        for corner in (box, box - 1, box - s, box - s - 1):
+            square = (corner, corner + 1, corner + s, corner + s + 1)
+            if all(self._blocked(boxes, i) for i in square):
+                if any(boxes >> i & 1 and not goal_mask >> i & 1 for i in square):
+                    return True
+        return False
+
+    def freeze_deadlock(self, boxes, box):
+        group = self._frozen(boxes, box, frozenset())
+        if group is None:
+            return False
+        goal_mask = self.board.goal_mask
+        return any(not goal_mask >> i & 1 for i in group)
+
+    def _frozen(self, boxes, c, walls):
+        # Returns the boxes frozen together with c, or None if c can still
+        # move. Boxes already on the current chain count as walls.
+        walls = walls | {c}
+        group = [c]
+        for d in (1, self.board.stride):
+            blocked = self._axis_blocked(boxes, c, d, walls)
+            if blocked is None:
+                return None
+            group.extend(blocked)
+        return group
+
+    def _axis_blocked(self, boxes, c, d, walls):
+        board = self.board
+        a, b = c - d, c + d
+        if not board.is_floor(a) or not board.is_floor(b) or a in walls or b in walls:
+            return []
+        if board.dead >> a & 1 and board.dead >> b & 1:
+            return []
+        for n in (a, b):
+            if boxes >> n & 1:
+                group = self._frozen(boxes, n, walls)
+                if group is not None:
+                    return group
+        return None
+
+    def corral_deadlock(self, state, box):
+        board = self.board
+        player, boxes = state
+        s = board.stride
+        free = board.floor & ~boxes
+        region = board.region(state)
+
+        interior = 0
+        for _, d in board.moves:
+            n = box + d
+            if free >> n & 1 and not region >> n & 1:
+                interior |= 1 << n
+        if not interior:
+            return False
+        area = free & ~region
+        while True:
+            grown = (interior | interior << 1 | interior >> 1 | interior << s | interior >> s) & area
+            if grown == interior:
+                break
+            interior = grown
+
+        near = interior << 1 | interior >> 1 | interior << s | interior >> s
+        corral_boxes = boxes & near
+        if not corral_boxes & ~board.goal_mask and not interior & board.goal_mask & ~boxes:
+            return False
+
+        # PI-corral: every push of a corral box the player can make goes
+        # into the corral, and no push needs the player in another corral.
+        box_mask = corral_boxes
+        while box_mask:
+            low = box_mask & -box_mask
+            c = low.bit_length() - 1
+            box_mask ^= low
+            for _, d in board.moves:
+                p, t = c - d, c + d
+                if not free >> t & 1 or board.dead >> t & 1 or not free >> p & 1:
+                    continue
+                if region >> p & 1:
+                    if not interior >> t & 1:
+                        return False
+                elif not interior >> p & 1:
+                    return False
+
+        # With only the corral boxes left on the board every push is at
+        # least as easy as before, so if they can't all reach goals (or let
+        # the player into the corral) the full position can't be solved.
+        key = board.normalize((player, corral_boxes))
+        solvable = self.corral_cache.get(key)
+        if solvable is None:
+            solvable = self._solvable(key, interior)
+            if len(self.corral_cache) >= self.cache_size:
+                self.corral_cache.clear()
+            self.corral_cache[key] = solvable
+        return not solvable
+
+    def _solvable(self, start, interior):
+        board = self.board
+        seen = {start}
+        q = deque([start])
+        while q:
+            state = q.popleft()
+            if board.is_goal(state) or len(seen) > self.corral_limit:
+                return True
+            if board.region(state) & interior:
+                return True
+            for new_state, _ in board.push_successors(state):
+                if new_state not in seen:
+                    seen.add(new_state)
+                    q.append(new_state)
+        return False
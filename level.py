@@ -0,0 +1,167 @@
+import io
+import xml.etree.ElementTree as ET
+
+import level_cache
+from bitboard import Bitboard
+
+
+class Level:
+    # Map, goals and game rules only. Nothing here needs pygame, so solver
+    # processes and servers can load levels without a display.
+
+    def __init__(self, map_file, use_cache=True):
+
+        self.map_file = map_file
+        compiled = level_cache.load(map_file) if use_cache else None
+        if compiled is not None:
+            self.map, self.player, self.boxes, self.goals, self.width, self.height, self.tilewidth, self.tileheight, \
+                tables = compiled
+            self.board = Bitboard(self.map, self.goals, tables)
+            return
+
+        self.map, self.player, self.boxes, self.goals, self.width, self.height, self.tilewidth, self.tileheight = \
+            self.load_map(map_file)
+        self.board = Bitboard(self.map, self.goals)
+        if use_cache:
+            try:
+                level_cache.save(map_file, self)
+            except OSError as e:
+                print("Could not write compiled level:", e)
+
+    @classmethod
+    def from_xsb(cls, lines, name="", tilewidth=32, tileheight=32):
+        from xsb import parse_xsb
+
+        level = cls.__new__(cls)
+        level.map_file = name
+        level.map, level.player, level.boxes, level.goals, level.width, level.height = parse_xsb(lines)
+        level.tilewidth, level.tileheight = tilewidth, tileheight
+        level.board = Bitboard(level.map, level.goals)
+        return level
+
+    @classmethod
+    def from_tmx(cls, text, name=""):
+        # TMX document given as a string (nothing on disk, so no compiled cache).
+        level = cls(io.StringIO(text), use_cache=False)
+        level.map_file = name
+        return level
+
+    def load_map(self, filename):
+        tree = ET.parse(filename)
+        root = tree.getroot()
+
+        width = int(root.attrib["width"])
+        height = int(root.attrib["height"])
+        tilewidth = int(root.attrib.get("tilewidth", 32))
+        tileheight = int(root.attrib.get("tileheight", 32))
+
+        
+        gid_map = {}  
+        for tileset in root.findall("tileset"):
+            firstgid = int(tileset.attrib.get("firstgid", 0))
+            source = tileset.attrib.get("source", "").lower()
+            #
+            if "wall" in source:
+                gid_map["wall"] = firstgid
+            elif "char" in source or "player" in source or "charactor" in source:
+                gid_map["player"] = firstgid
+            elif "box" in source:
+                gid_map["box"] = firstgid
+            elif "star" in source or "goal" in source or "checkpoint" in source:
+                gid_map["goal"] = firstgid
+
+        gid_map.setdefault("wall", gid_map.get("wall", 7))
+        gid_map.setdefault("player", gid_map.get("player", 8))
+        gid_map.setdefault("box", gid_map.get("box", 9))
+        gid_map.setdefault("goal", gid_map.get("goal", 10))
+
+        
+        game_map = [[" " for _ in range(width)] for _ in range(height)]
+
+        
+        goals_set = set()
+
+        
+        for layer in root.findall("layer"):
+            name = layer.attrib.get("name", "").lower()
+            data_el = layer.find("data")
+            if data_el is None or data_el.text is None:
+                continue
+
+            
+            raw_data = data_el.text.strip().replace("\r", " ").replace("\n", " ")
+            gids = [int(x) for x in raw_data.replace(" ", "").split(",") if x.strip() != ""]
+
+            
+            for y in range(height):
+                for x in range(width):
+                    gid = gids[y * width + x]
+                    if gid == 0:
+                        continue
+
+                    
+                    if name == "wall" or gid == gid_map.get("wall"):
+                        game_map[y][x] = "#"
+
+                    
+                    if "checkpoint" in name or "goal" in name or gid == gid_map.get("goal"):
+                        game_map[y][x] = "."
+                        goals_set.add((x, y))
+
+        player = None
+        boxes = []
+        
+
+        
+        for og in root.findall("objectgroup"):
+            oname = og.attrib.get("name", "").lower()
+            for obj in og.findall("object"):
+                gid_attr = obj.attrib.get("gid")
+
+                gid = int(gid_attr) if gid_attr is not None else None
+
+                ox = float(obj.attrib.get("x", "0"))
+                oy = float(obj.attrib.get("y", "0"))
+
+                
+                ty = int((oy - tileheight) // tileheight)
+                tx = int(ox // tilewidth)
+
+                
+                if ty < 0:
+                    ty = 0
+                if tx < 0:
+                    tx = 0
+                if ty >= height:
+                    ty = height - 1
+                if tx >= width:
+                    tx = width - 1
+
+                
+                if oname == "player" or (gid is not None and gid == gid_map["player"]):
+                    player = (tx, ty)
+                elif oname == "box" or (gid is not None and gid == gid_map["box"]):
+                    boxes.append((tx, ty))
+
+        
+        for (gx, gy) in goals_set:
+            
+            game_map[gy][gx] = "."
+
+        
+        goals = sorted(list(goals_set))
+
+        return game_map, player, boxes, goals, width, height, tilewidth, tileheight
+
+    def is_goal(self, state):
+        _, boxes = state
+        return all(box in self.goals for box in boxes)
+
+    def is_wall(self, x, y):
+        return x < 0 or x >= self.width or y < 0 or y >= self.height or self.map[y][x] == "#"
+
+    def is_dead_square(self, x, y):
+        return self.board.dead >> self.board.index(x, y) & 1
+
+    def get_start_state(self):
+        return (self.player, tuple(self.boxes))
@@ -0,0 +1,127 @@
+import glob
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+# Compiled levels live in a ".compiled" folder next to the .tmx file and are
+# named after the source stem plus a hash of its bytes, so editing the map
+# makes the next load recompile it.
+#
+# Layout (little endian):
+#   header   magic, version, width, height, tilewidth, tileheight,
+#            player x/y (-1 if none), box count, goal count, board size
+#   boxes    box count  * (x, y) uint16
+#   goals    goal count * (x, y) uint16
+#   masks    floor, goal and dead-square bitboards, mask_bytes each
+#   dists    goal count * board size int16 push distances (-1 = unreachable)
+MAGIC = b"SKBL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHHhhHHI")
+CACHE_DIR = ".compiled"
+
+
+def cache_path(map_file):
+    with open(map_file, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+    folder = os.path.join(os.path.dirname(os.path.abspath(map_file)), CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(map_file))[0]
+    return os.path.join(folder, "%s-%s.lvl" % (stem, digest))
+
+
+def _mask_bytes(size):
+    return (size + 7) // 8
+
+
+def save(map_file, level):
+    board = level.board
+    distances = board.push_distances()
+    player = level.player if level.player is not None else (-1, -1)
+    nbytes = _mask_bytes(board.size)
+
+    parts = [HEADER.pack(MAGIC, VERSION, level.width, level.height, level.tilewidth, level.tileheight,
+                         player[0], player[1], len(level.boxes), len(level.goals), board.size)]
+    parts.append(array("H", [v for box in level.boxes for v in box]).tobytes())
+    parts.append(array("H", [v for goal in level.goals for v in goal]).tobytes())
+    for mask in (board.floor, board.goal_mask, board.dead):
+        parts.append(mask.to_bytes(nbytes, "little"))
+    for dist in distances:
+        parts.append(array("h", dist).tobytes())
+
+    path = cache_path(map_file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    stem = os.path.basename(path).rsplit("-", 1)[0]
+    for old in glob.glob(os.path.join(os.path.dirname(path), glob.escape(stem) + "-*.lvl")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(parts))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(map_file):
+    # Returns the Level fields plus the bitboard tables, or None when there
+    # is no up-to-date compiled file.
+    try:
+        path = cache_path(map_file)
+        with open(path, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                data = f.read()
+    except OSError:
+        return None
+
+    try:
+        # The view (and every slice of it) must be gone before the mmap is
+        # closed, so it is released by the with block even on errors.
+        with memoryview(data) as view:
+            (magic, version, width, height, tilewidth, tileheight,
+             px, py, nboxes, ngoals, size) = HEADER.unpack_from(view, 0)
+            if magic != MAGIC or version != VERSION:
+                return None
+            nbytes = _mask_bytes(size)
+            if len(view) != HEADER.size + 4 * (nboxes + ngoals) + 3 * nbytes + ngoals * 2 * size:
+                return None
+            offset = HEADER.size
+
+            coords = array("H")
+            coords.frombytes(view[offset:offset + 4 * (nboxes + ngoals)])
+            offset += 4 * (nboxes + ngoals)
+            boxes = [(coords[i], coords[i + 1]) for i in range(0, 2 * nboxes, 2)]
+            goals = [(coords[i], coords[i + 1]) for i in range(2 * nboxes, 2 * (nboxes + ngoals), 2)]
+
+            masks = []
+            for _ in range(3):
+                masks.append(int.from_bytes(view[offset:offset + nbytes], "little"))
+                offset += nbytes
+
+            distances = []
+            for _ in range(ngoals):
+                dist = array("h")
+                dist.frombytes(view[offset:offset + 2 * size])
+                distances.append(dist)
+                offset += 2 * size
+    except (struct.error, ValueError):
+        # Damaged or truncated file: the caller compiles the level again.
+        return None
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+    floor = masks[0]
+    stride = width + 2
+    game_map = [["#" if not floor >> ((y + 1) * stride + x + 1) & 1 else " " for x in range(width)]
+                for y in range(height)]
+    for (gx, gy) in goals:
+        game_map[gy][gx] = "."
+
+    player = (px, py) if px >= 0 else None
+    tables = {"floor": floor, "goal_mask": masks[1], "dead": masks[2], "distances": distances}
+    return game_map, player, boxes, goals, width, height, tilewidth, tileheight, tables
@@ -0,0 +1,190 @@
+from collections import deque
+
+from bitboard import Macro, iter_bits
+
+
+def tunnel_masks(board):
+    # For each move, the cells that have no floor on either side across
+    # that move: a player standing there behind a box can only push on.
+    s = board.stride
+    across = {"U": 1, "D": 1, "L": s, "R": s}
+    masks = {}
+    for action, _ in board.moves:
+        a = across[action]
+        masks[action] = board.floor & ~(board.floor << a) & ~(board.floor >> a)
+    return masks
+
+
+def find_goal_room(board, root):
+    # The largest area holding at least two goals, no boxes and not the
+    # player, that the rest of the level reaches through a single cell:
+    # returns (entrance, move into the room, room mask) or None.
+    player, boxes = root
+    best = None
+    for e in iter_bits(board.floor):
+        for action, d in board.moves:
+            door = e + d
+            if not board.floor >> door & 1 or not board.floor >> (e - d) & 1:
+                continue
+            room = board.reachable(door, 1 << e)
+            if room >> player & 1 or room & boxes:
+                continue
+            goals = bin(room & board.goal_mask).count("1")
+            if goals < 2:
+                continue
+            # Only the door may touch the entrance.
+            if any(room >> (e + d2) & 1 for _, d2 in board.moves if d2 != d):
+                continue
+            size = bin(room).count("1")
+            if best is None or (goals, -size) > best[:2]:
+                best = (goals, -size, e, action, room)
+    return best and best[2:]
+
+
+def box_path(board, start, slot, player, filled, room):
+    # Pushes that take a box from `start` to `slot` inside the room with
+    # the player starting at `player` and the `filled` slots holding boxes.
+    # Boxes outside the room are ignored here and checked when used.
+    offsets = dict(board.moves)
+    first = (start, board.normalize((player, filled | 1 << start))[0])
+    parent = {first: None}
+    q = deque([first])
+    while q:
+        box, p = q.popleft()
+        if box == slot:
+            pushes = []
+            node = (box, p)
+            while parent[node] is not None:
+                node, push = parent[node]
+                pushes.append(push)
+            pushes.reverse()
+            return pushes
+        region = board.reachable(p, filled | 1 << box)
+        for action, d in board.moves:
+            target = box + d
+            if not region >> (box - d) & 1 or not room >> target & 1 or filled >> target & 1:
+                continue
+            if board.dead >> target & 1:
+                continue
+            node = (target, board.normalize((box, filled | 1 << target))[0])
+            if node not in parent:
+                parent[node] = ((box, p), (box, action))
+                q.append(node)
+    return None
+
+
+def packing_order(board, entrance, action, room):
+    # Fills the room's goals deepest first, each with a box pushed in from
+    # the entrance; returns [(slot, pushes after entering)] or None if the
+    # greedy order gets stuck.
+    d = dict(board.moves)[action]
+    door = entrance + d
+    depth = {door: 0}
+    q = deque([door])
+    while q:
+        i = q.popleft()
+        for _, step in board.moves:
+            n = i + step
+            if room >> n & 1 and n not in depth:
+                depth[n] = depth[i] + 1
+                q.append(n)
+
+    slots = sorted(iter_bits(room & board.goal_mask), key=lambda g: -depth.get(g, 0))
+    order = []
+    filled = 0
+    while slots:
+        for slot in slots:
+            pushes = box_path(board, door, slot, entrance, filled, room)
+            if pushes is not None:
+                break
+        else:
+            return None
+        order.append((slot, pushes))
+        filled |= 1 << slot
+        slots.remove(slot)
+    return order
+
+
+class MacroGenerator:
+    # Turns single pushes into macro pushes:
+    #   tunnel    - a box pushed with the player ending between two walls is
+    #               pushed on through the corridor, until it leaves it or
+    #               reaches a goal.
+    #   goal room - a box pushed through the goal room's entrance while the
+    #               room holds exactly the first k boxes of its packing order
+    #               is pushed straight on to slot k + 1.
+
+    def __init__(self, board, root):
+        self.board = board
+        self.offsets = dict(board.moves)
+        self.tunnels = tunnel_masks(board)
+        self.room = None
+        found = find_goal_room(board, root)
+        if found is not None:
+            entrance, action, room = found
+            order = packing_order(board, entrance, action, room)
+            if order is not None:
+                self.room = (entrance, action, room)
+                self.fills = {}
+                filled = 0
+                for slot, pushes in order:
+                    self.fills[filled] = pushes
+                    filled |= 1 << slot
+        self.tunnel_macros = 0
+        self.room_macros = 0
+
+    def wrap(self, successors):
+        def with_macros(state):
+            result = []
+            for succ, action in successors(state):
+                macro = self._extend(state, succ, action)
+                result.append(macro or (succ, action))
+            return result
+        return with_macros
+
+    def _play(self, boxes, player, pushes):
+        # Checks each push against the real boxes; returns the state after
+        # all of them, or None.
+        board = self.board
+        for b, action in pushes:
+            d = self.offsets[action]
+            if not boxes >> b & 1 or not board.reachable(player, boxes) >> (b - d) & 1:
+                return None
+            target = b + d
+            if not board.floor >> target & 1 or boxes >> target & 1:
+                return None
+            boxes ^= (1 << b) ^ (1 << target)
+            player = b
+        return player, boxes
+
+    def _extend(self, state, succ, push):
+        board = self.board
+        b, action = push
+        d = self.offsets[action]
+        box = b + d
+        boxes = succ[1]
+        pushes = [push]
+
+        if self.tunnels[action] >> b & 1:
+            free = board.floor & ~boxes
+            while (not board.goal_mask >> box & 1 and self.tunnels[action] >> box & 1
+                   and free >> (box + d) & 1 and not board.dead >> (box + d) & 1):
+                pushes.append((box, action))
+                boxes ^= (1 << box) ^ (1 << (box + d))
+                free = board.floor & ~boxes
+                box += d
+            if len(pushes) > 1:
+                self.tunnel_macros += 1
+
+        # A tunnel often leads up to the room, so both can chain.
+        if self.room is not None and box - d == self.room[0] and action == self.room[1]:
+            fill = self.fills.get(boxes & self.room[2] & ~(1 << box))
+            if fill:
+                played = self._play(boxes, box - d, fill)
+                if played is not None:
+                    self.room_macros += 1
+                    return board.normalize(played), Macro(pushes + fill)
+
+        if len(pushes) == 1:
+            return None
+        return board.normalize((box - d, boxes)), Macro(pushes)
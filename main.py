@@ -1,24 +1,19 @@
-import csv
 import multiprocessing
+import queue
 import time
 import pygame
 import os
 
 from menu import menu_loop
+from portfolio import run_portfolio
+from progress import format_progress
+from runner import append_results, result_row, run_solver_func, solver_class
+from solution_cache import open_cache
 from sokoban import Sokoban
 
-try:
-    from algorithms.bfs import BFS
-except Exception:
-    BFS = None
-try:
-    from algorithms.dfs import DFS
-except Exception:
-    DFS = None
-try:
-    from algorithms.astar import AStar
-except Exception:
-    AStar = None
+# Every progress snapshot of a solver started from the menu is also
+# appended here as one JSON object per line.
+PROGRESS_FILE = "solver_progress.jsonl"
 
 
 def show_text(screen, text, size=40):
@@ -30,45 +25,40 @@ def show_text(screen, text, size=40):
     pygame.display.flip()
 
 
-def run_solver_func(map_path, algo_name, result_queue):
-    try:
-        from sokoban import Sokoban
-        from algorithms.bfs import BFS
-        from algorithms.dfs import DFS
-        from algorithms.astar import AStar
-
-        game = Sokoban(map_path, assets_dir="assets")
-        start = game.get_start_state()
-
-        solver = None
-        if algo_name.upper().startswith("BFS"):
-            solver = BFS(game) if BFS is not None else None
-        elif algo_name.upper().startswith("DFS"):
-            solver = DFS(game) if DFS is not None else None
-        elif algo_name.upper().startswith("A"):
-            solver = AStar(game) if AStar is not None else None
-
-        if solver is None:
-            result_queue.put((None, 0))
-            return
-
-        if hasattr(solver, "solve"):
-            result = solver.solve(start)
-        elif callable(solver):
-            result = solver(game, start)
-        else:
-            result = None
+def show_lines(screen, lines, size=32):
+    screen.fill((30, 30, 30))
+    font = pygame.font.Font(None, size)
+    surfs = [font.render(line, True, (255, 255, 255)) for line in lines]
+    y = screen.get_height()//2 - sum(s.get_height() + 8 for s in surfs)//2
+    for surf in surfs:
+        screen.blit(surf, (screen.get_width()//2 - surf.get_width()//2, y))
+        y += surf.get_height() + 8
+    pygame.display.flip()
 
-        expanded = getattr(solver, "expanded", 0)
-        # gửi tuple về tiến trình chính
-        result_queue.put((result, expanded))
 
-    except Exception as e:
-        print("Error in solver process:", e)
+def watch_solver(screen, p, progress_queue, title, timeout=900):
+    # Shows the solver's live progress until its process exits.
+    # Esc or closing the window cancels it. Returns "done", "cancelled",
+    # "quit" or "timeout".
+    clock = pygame.time.Clock()
+    started = time.time()
+    lines = ["Starting..."]
+    while p.is_alive():
+        for e in pygame.event.get():
+            if e.type == pygame.QUIT or (e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE):
+                p.terminate()
+                p.join()
+                return "quit" if e.type == pygame.QUIT else "cancelled"
         try:
-            result_queue.put((None, 0))
-        except Exception:
+            while True:
+                lines = format_progress(progress_queue.get_nowait())
+        except queue.Empty:
             pass
+        if time.time() - started > timeout:
+            return "timeout"
+        show_lines(screen, [title + " - WAITING..."] + lines + ["", "Esc: cancel"])
+        clock.tick(10)
+    return "done"
 
 
 def main():
@@ -99,34 +89,48 @@ def main():
     pygame.event.pump()
 
     
-    solver_stub = None
-    if algo_name.upper().startswith("BFS") and BFS is not None:
-        solver_stub = BFS(game)
-    elif algo_name.upper().startswith("DFS") and DFS is not None:
-        solver_stub = DFS(game)
-    elif (algo_name.upper().startswith("A") or algo_name.upper().startswith("ASTAR")) and AStar is not None:
-        solver_stub = AStar(game)
-    else:
-        try:
-            mod = __import__("algorithms.bfs", fromlist=["bfs"])
-            if hasattr(mod, "bfs"):
-                solver_stub = lambda g: mod.bfs(g, game.get_start_state())
-        except:
-            pass
+    if algo_name.upper().startswith("PORTFOLIO"):
+        winner, solution = run_portfolio(map_path)
+        if solution is None:
+            print("No solution.")
+            show_text(screen, "No solution.", size=36)
+            return
+        print("Winner:", winner, "| Steps:", len(solution))
+        game.animate_solution(screen, solution, delay_ms=300)
+        return
 
-    if solver_stub is None:
+    if solver_class(algo_name) is None:
         print("Không tìm thấy solver phù hợp. Kiểm tra thư mục algorithms/ và tên class.")
         return
 
+    cache = open_cache()
+    hit = cache.get(game, algo_name) if cache is not None else None
+    if cache is not None:
+        cache.close()
+    if hit is not None:
+        print("Cached solution:", map_path, algo_name, "| Steps:", len(hit["solution"]),
+              "| Expanded when solved:", hit["expanded"])
+        game.animate_solution(screen, hit["solution"], delay_ms=300)
+        return
+
     
     start_time = time.time()
     result_queue = multiprocessing.Queue()
+    progress_queue = multiprocessing.Queue()
     p = multiprocessing.Process(
         target=run_solver_func,
-        args=(map_path, algo_name, result_queue)
+        args=(map_path, algo_name, result_queue, progress_queue, PROGRESS_FILE)
     )
     p.start()
-    p.join(timeout=900)  
+    status = watch_solver(screen, p, progress_queue, algo_name, timeout=900)
+    if status == "quit":
+        pygame.quit()
+        return
+    if status == "cancelled":
+        print("Cancelled:", map_path, algo_name)
+        show_text(screen, "Cancelled.", size=36)
+        return
+    p.join(timeout=5)
 
     end_time = time.time()
     time_sec = round(end_time - start_time, 4)
@@ -164,15 +168,7 @@ def main():
         solution_length = len(solution)
 
     
-    csv_file = "experiment_results.csv"
-    write_header = not os.path.exists(csv_file)
-    with open(csv_file, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if write_header:
-            writer.writerow(["map_name", "algo_name", "time_sec",
-                             "solution_length", "expanded_states", "success"])
-        writer.writerow([map_path, algo_name, time_sec,
-                         solution_length, expanded_states, success])
+    append_results([result_row(map_path, algo_name, time_sec, solution, expanded_states)])
 
     print("Result:", map_path, algo_name, "| Time:", time_sec,
           "| Steps:", solution_length, "| Expanded:", expanded_states,
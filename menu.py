@@ -3,7 +3,10 @@ import sys
 import os
 
 
-ALGORITHMS = ["BFS", "DFS", "A*"]
+ALGORITHMS = ["BFS", "DFS", "A*", "IDA*", "IDDFS", "Greedy",
+              "BFS (push)", "DFS (push)", "A* (push)", "IDA* (push)", "IDDFS (push)", "Greedy (push)",
+              "Bidirectional (push)", "Anytime A* (push)", "A* macros (push)",
+              "Portfolio"]
 
 def menu_loop(screen):
     clock = pygame.time.Clock()
@@ -0,0 +1,64 @@
+import multiprocessing
+import queue
+import time
+
+from runner import append_results, result_row, solve
+
+PORTFOLIO = ["BFS (push)", "A* (push)", "A* manhattan (push)", "Greedy (push)", "IDA* (push)"]
+
+
+def portfolio_worker(map_path, algo_name, result_queue):
+    try:
+        result = solve(map_path, algo_name)
+        result_queue.put((algo_name, result["solution"], result["expanded"]))
+    except Exception as e:
+        print("Error in portfolio solver", algo_name, ":", e)
+        result_queue.put((algo_name, None, 0))
+
+
+def run_portfolio(map_path, algo_names=PORTFOLIO, timeout=900, csv_file="experiment_results.csv"):
+    # Every solver gets its own process. The first one to return a valid
+    # solution wins and the rest are terminated. One CSV row is written
+    # per solver; cancelled solvers are recorded as unsuccessful.
+    result_queue = multiprocessing.Queue()
+    processes = {}
+    for name in algo_names:
+        p = multiprocessing.Process(target=portfolio_worker, args=(map_path, name, result_queue))
+        p.start()
+        processes[name] = p
+
+    start_time = time.time()
+    finished = {}
+    winner = None
+    while len(finished) < len(processes) and winner is None:
+        remaining = timeout - (time.time() - start_time)
+        if remaining <= 0:
+            break
+        try:
+            name, solution, expanded = result_queue.get(timeout=min(remaining, 0.5))
+        except queue.Empty:
+            for name, p in processes.items():
+                if name not in finished and not p.is_alive() and p.exitcode not in (0, None):
+                    finished[name] = (None, 0, round(time.time() - start_time, 4))
+            continue
+        finished[name] = (solution, expanded, round(time.time() - start_time, 4))
+        if solution is not None:
+            winner = name
+
+    cancelled_at = round(time.time() - start_time, 4)
+    for name, p in processes.items():
+        if p.is_alive():
+            p.terminate()
+        p.join()
+
+    rows = []
+    for name in algo_names:
+        solution, expanded, time_sec = finished.get(name, (None, 0, cancelled_at))
+        rows.append(result_row(map_path, "Portfolio/" + name, time_sec, solution, expanded))
+        status = "winner" if name == winner else ("finished" if name in finished else "cancelled")
+        print("Portfolio:", name, "|", status, "| Time:", time_sec, "| Expanded:", expanded)
+    append_results(rows, csv_file)
+
+    if winner is None:
+        return None, None
+    return winner, finished[winner][0]
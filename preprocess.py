@@ -0,0 +1,148 @@
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+from deadlock import dead_squares, pull_distances
+
+# Per-level tables built once when a board is created. With NumPy the board
+# is laid out as flat boolean arrays over the padded cell indexes and every
+# table is computed for all cells (and all goals) at once; without it the
+# same tables come from the plain loops. The results are handed to the
+# solvers as Python ints and lists, which are faster to index one cell at a
+# time than NumPy scalars.
+
+
+def mask_to_array(mask, size):
+    data = np.frombuffer(mask.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(data, bitorder="little")[:size].astype(bool)
+
+
+def array_to_mask(cells):
+    return int.from_bytes(np.packbits(cells, bitorder="little").tobytes(), "little")
+
+
+def _shift(cells, d):
+    # shifted[i] = cells[i - d] along the first (cell) axis; the wall ring
+    # keeps floor cells from ever being shifted across a row end.
+    shifted = np.zeros_like(cells)
+    if d > 0:
+        shifted[d:] = cells[:-d]
+    else:
+        shifted[:d] = cells[-d:]
+    return shifted
+
+
+def floor_mask(board, game_map):
+    if np is None:
+        floor = 0
+        for y, row in enumerate(game_map):
+            for x, c in enumerate(row):
+                if c != "#":
+                    floor |= 1 << board.index(x, y)
+        return floor
+    grid = np.zeros((board.height + 2, board.stride), dtype=bool)
+    for y, row in enumerate(game_map):
+        grid[y + 1, 1:len(row) + 1] = np.frombuffer("".join(row).encode("latin-1"), dtype=np.uint8) != ord("#")
+    return array_to_mask(grid.ravel())
+
+
+def _pull_bfs(board, sources):
+    # Breadth-first over pulls from every row of `sources` at once, as in
+    # deadlock.pull_distances: a box on c is pulled to c + d when c + d and
+    # c + 2d are floor. Returns the fewest pushes from each cell to each
+    # source row, -1 where unreachable.
+    #
+    # The sources are packed eight to a byte per cell, so a step costs
+    # size * len(sources) / 8 bytes of work. Distances are kept as bit
+    # planes: cells first reached at step s are or-ed into plane j for each
+    # bit j set in s.
+    count = len(sources)
+    floor = mask_to_array(board.floor, board.size)
+    pullable = [(d, np.where(floor & _shift(floor, -d), 255, 0).astype(np.uint8)[:, None])
+                for _, d in board.moves]
+    frontier = np.packbits(sources.T, axis=1, bitorder="little")
+    seen = frontier.copy()
+    planes = []
+    step = 0
+    while True:
+        step += 1
+        reached = np.zeros_like(frontier)
+        for d, ok in pullable:
+            reached |= _shift(frontier, d) & ok
+        frontier = reached & ~seen
+        if not frontier.any():
+            break
+        seen |= frontier
+        if step.bit_length() > len(planes):
+            planes.append(np.zeros_like(frontier))
+        for j, plane in enumerate(planes):
+            if step >> j & 1:
+                plane |= frontier
+
+    def unpack(packed):
+        return np.unpackbits(packed, axis=1, count=count, bitorder="little")
+
+    dist = np.zeros((board.size, count), dtype=np.int16)
+    for j, plane in enumerate(planes):
+        dist |= unpack(plane).astype(np.int16) << j
+    dist[unpack(seen) == 0] = -1
+    return dist.T
+
+
+def goal_array(board):
+    return np.flatnonzero(mask_to_array(board.goal_mask, board.size))
+
+
+def dead_mask(board):
+    if np is None:
+        return dead_squares(board)
+    goals = mask_to_array(board.goal_mask, board.size)
+    live = _pull_bfs(board, goals[None, :])[0] >= 0
+    return board.floor & ~array_to_mask(live)
+
+
+def push_distance_tables(board):
+    # One table per goal, in goal index order.
+    if np is None:
+        return [pull_distances(board, g) for g in _bits(board.goal_mask)]
+    goals = goal_array(board)
+    sources = np.zeros((len(goals), board.size), dtype=bool)
+    sources[np.arange(len(goals)), goals] = True
+    return _pull_bfs(board, sources).tolist()
+
+
+def manhattan_table(board):
+    # Manhattan distance from each floor cell to its nearest goal, 0 off the floor.
+    goals = [board.coords(i) for i in _bits(board.goal_mask)]
+    if np is None or not goals:
+        table = [0] * board.size
+        if goals:
+            for i in _bits(board.floor):
+                x, y = board.coords(i)
+                table[i] = min(abs(x - gx) + abs(y - gy) for gx, gy in goals)
+        return table
+    y, x = np.divmod(np.arange(board.size), board.stride)
+    gy, gx = np.divmod(goal_array(board), board.stride)
+    dist = (np.abs(x[:, None] - gx[None, :]) + np.abs(y[:, None] - gy[None, :])).min(axis=1)
+    return np.where(mask_to_array(board.floor, board.size), dist, 0).tolist()
+
+
+def goal_cost_rows(board, distances, unreachable):
+    # For each cell, its push distance to every goal (`unreachable` for
+    # goals it can't reach). Off the floor every goal is unreachable: a box
+    # drawn on a wall never moves.
+    if np is None or not distances:
+        rows = [[unreachable] * len(distances)] * board.size
+        for i in _bits(board.floor):
+            rows[i] = [dist[i] if dist[i] >= 0 else unreachable for dist in distances]
+        return rows
+    table = np.asarray(distances, dtype=np.int64)
+    return np.where(table >= 0, table, unreachable).T.tolist()
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,134 @@
+import cProfile
+import csv
+import io
+import os
+import pstats
+import time
+
+PROFILE_FILE = "profile_results.csv"
+PROFILE_REPORT = "profile_report.txt"
+PROFILE_HEADER = ["map_name", "algo_name", "phase", "calls", "total_sec", "us_per_call", "share"]
+MODES = ("phases", "cprofile")
+
+# (phase, owner, method). Owners are looked up on the solver; the timer is
+# put on the instance, so calls through self.<method> inside the owner's own
+# code are timed too. Phases nest (successors contains reachability and
+# deadlock checks), so times are inclusive and shares don't add up to 1.
+PHASES = (
+    ("successors", "solver", "successors"),
+    ("pull_successors", "solver", "pull_successors"),
+    ("reachability", "board", "reachable"),
+    ("all_boxes_blocked", "board", "all_boxes_blocked"),
+    ("goal_test", "board", "is_goal"),
+    ("deadlock", "detector", "is_deadlock"),
+    ("freeze_deadlock", "detector", "freeze_deadlock"),
+    ("corral_deadlock", "detector", "corral_deadlock"),
+    ("heuristic_prepare", "h", "prepare"),
+    ("heuristic", "h", "estimate_child"),
+    ("hashing", "zobrist", "update"),
+    ("table_get", "table", "get"),
+    ("table_put", "table", "put"),
+)
+
+
+class Profiler:
+    # Per-phase call counts and times for one solver. Nothing is wrapped
+    # until install(), so a solver that is not being profiled runs its
+    # normal methods with no extra cost. With cprofile=True the whole solve
+    # also runs under cProfile.
+
+    def __init__(self, solver, cprofile=False):
+        self.solver = solver
+        self.cprofile = cprofile
+        self.calls = {}
+        self.times = {}
+        self.installed = []
+        self.total = 0.0
+        self.stats = None
+
+    def _owner(self, name):
+        if name == "solver":
+            return self.solver
+        return getattr(self.solver, name, None)
+
+    def _timed(self, phase, method):
+        calls, times = self.calls, self.times
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            t = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times[phase] += clock() - t
+                calls[phase] += 1
+        return timed
+
+    def install(self):
+        for phase, owner_name, method_name in PHASES:
+            owner = self._owner(owner_name)
+            method = getattr(owner, method_name, None) if owner is not None else None
+            if method is None:
+                continue
+            self.calls[phase] = 0
+            self.times[phase] = 0.0
+            had_own = method_name in getattr(owner, "__dict__", {})
+            setattr(owner, method_name, self._timed(phase, method))
+            self.installed.append((owner, method_name, method if had_own else None))
+        return self
+
+    def uninstall(self):
+        for owner, method_name, original in reversed(self.installed):
+            if original is None:
+                delattr(owner, method_name)
+            else:
+                setattr(owner, method_name, original)
+        self.installed = []
+
+    def run(self, func, *args):
+        self.install()
+        profile = cProfile.Profile() if self.cprofile else None
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                profile.enable()
+            return func(*args)
+        finally:
+            if profile is not None:
+                profile.disable()
+                self.stats = profile
+            self.total = time.perf_counter() - start
+            self.uninstall()
+
+    def rows(self, map_name, algo_name):
+        total = self.total or 1e-9
+        rows = [[map_name, algo_name, "solve", 1, round(self.total, 6), round(self.total * 1e6, 2), 1.0]]
+        for phase, _, _ in PHASES:
+            if not self.calls.get(phase):
+                continue
+            calls, t = self.calls[phase], self.times[phase]
+            rows.append([map_name, algo_name, phase, calls, round(t, 6),
+                         round(t * 1e6 / calls, 3), round(t / total, 4)])
+        return rows
+
+    def report(self, map_name, algo_name, top=25):
+        lines = ["%s | %s | solve %.3fs" % (map_name, algo_name, self.total),
+                 "%-24s %10s %10s %10s %7s" % ("phase", "calls", "total s", "us/call", "share")]
+        for row in self.rows(map_name, algo_name)[1:]:
+            lines.append("%-24s %10d %10.3f %10.3f %6.1f%%" % (row[2], row[3], row[4], row[5], 100 * row[6]))
+        if self.stats is not None:
+            out = io.StringIO()
+            pstats.Stats(self.stats, stream=out).sort_stats("cumulative").print_stats(top)
+            lines.append(out.getvalue())
+        return "\n".join(lines) + "\n"
+
+
+def write_profile(profiler, map_name, algo_name, csv_file=PROFILE_FILE, report_file=PROFILE_REPORT):
+    write_header = not os.path.exists(csv_file)
+    with open(csv_file, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(PROFILE_HEADER)
+        writer.writerows(profiler.rows(map_name, algo_name))
+    with open(report_file, "a", encoding="utf-8") as f:
+        f.write(profiler.report(map_name, algo_name) + "\n")
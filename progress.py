@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+# Solvers call Progress.update once every CHECK_EVERY expansions; the clock
+# is only read there, so a search with no progress attached pays one
+# attribute test per 1024 nodes.
+CHECK_EVERY = 1024
+
+
+def peak_rss_mb():
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    if sys.platform == "darwin":
+        rss /= 1024
+    return round(rss / 1024, 1)
+
+
+def rss_mb():
+    # Current resident set size where /proc has it, else the peak.
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except Exception:
+        return peak_rss_mb()
+
+
+class Progress:
+    # Sends a snapshot of a running search every `interval` seconds to a
+    # multiprocessing queue and/or appends it to a JSON-lines file. Fields:
+    # elapsed, expanded, frontier, closed, states_per_sec, best_f, rss_mb,
+    # plus whatever is given in `tags` (map and solver name).
+
+    def __init__(self, queue=None, log_file=None, interval=0.5, tags=None):
+        self.queue = queue
+        self.log_file = log_file
+        self.interval = interval
+        self.tags = tags or {}
+        self.started = time.time()
+        self.last = self.started
+        self.last_expanded = 0
+
+    def update(self, expanded, frontier, closed, best_f, force=False):
+        now = time.time()
+        if not force and now - self.last < self.interval:
+            return
+        rate = (expanded - self.last_expanded) / max(now - self.last, 1e-6)
+        self.last, self.last_expanded = now, expanded
+        record = dict(self.tags)
+        record.update({
+            "elapsed": round(now - self.started, 2),
+            "expanded": expanded,
+            "frontier": frontier,
+            "closed": closed,
+            "states_per_sec": round(rate, 1),
+            "best_f": best_f,
+            "rss_mb": rss_mb(),
+        })
+        if self.queue is not None:
+            try:
+                self.queue.put_nowait(record)
+            except Exception:
+                pass
+        if self.log_file:
+            try:
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError:
+                pass
+        return record
+
+
+def format_progress(record):
+    return ["Expanded: %d" % record["expanded"],
+            "Frontier: %d   Closed: %d" % (record["frontier"], record["closed"]),
+            "States/sec: %.0f   Best f: %s" % (record["states_per_sec"], record["best_f"]),
+            "Memory: %.1f MB   Elapsed: %.0fs" % (record["rss_mb"], record["elapsed"])]
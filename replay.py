@@ -0,0 +1,69 @@
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+ACTION_NAMES = {"UP": "U", "DOWN": "D", "LEFT": "L", "RIGHT": "R"}
+
+
+class Replay:
+    # Plays a solution by the game rules only, one O(1) move or push per
+    # action, and keeps every packed state so any step can be shown again
+    # without replaying from the start. Raises ValueError at the first
+    # illegal action.
+
+    def __init__(self, level, solution):
+        self.board = level.board
+        self.actions = [ACTION_NAMES.get(a.upper(), a.upper()) for a in solution]
+        state = self.board.pack(level.get_start_state())
+        self.states = [state]
+        for step, action in enumerate(self.actions):
+            if action not in self.board.action_index:
+                raise ValueError("Unknown action %r at step %d" % (action, step + 1))
+            state = self.board.apply(state, action)
+            if state is None:
+                raise ValueError("Illegal action %r at step %d" % (action, step + 1))
+            self.states.append(state)
+        self.position = 0
+
+    def __len__(self):
+        return len(self.actions)
+
+    def state(self, step=None):
+        return self.board.unpack(self.states[self.position if step is None else step])
+
+    def seek(self, step):
+        self.position = max(0, min(step, len(self.actions)))
+        return self.state()
+
+    def forward(self):
+        return self.seek(self.position + 1)
+
+    def backward(self):
+        return self.seek(self.position - 1)
+
+    def at_end(self):
+        return self.position == len(self.actions)
+
+    def is_solved(self):
+        return self.board.is_goal(self.states[-1])
+
+    def box_positions(self):
+        # (steps + 1, boxes, 2) array of (x, y). Each box keeps its column
+        # for the whole solution, so a box's track is positions[:, k].
+        if np is None:
+            raise ImportError("box_positions needs NumPy")
+        _, boxes = self.board.unpack(self.states[0])
+        track = list(boxes)
+        column = {box: k for k, box in enumerate(track)}
+        rows = [list(track)]
+        offsets = dict(self.board.moves)
+        for step, action in enumerate(self.actions):
+            before, after = self.states[step][1], self.states[step + 1][1]
+            if before != after:
+                b = self.states[step][0] + offsets[action]
+                k = column.pop(self.board.coords(b))
+                track[k] = self.board.coords(b + offsets[action])
+                column[track[k]] = k
+            rows.append(list(track))
+        return np.array(rows, dtype=np.int16).reshape(len(rows), len(track), 2)
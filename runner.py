@@ -0,0 +1,176 @@
+import csv
+import os
+import time
+
+from level import Level
+from profiling import Profiler, write_profile
+from progress import Progress
+from solution_cache import open_cache
+
+CSV_FILE = "experiment_results.csv"
+CSV_HEADER = ["map_name", "algo_name", "time_sec", "solution_length", "expanded_states", "success"]
+# "phases" times the search hot paths, "cprofile" adds a full cProfile run.
+# Results go to profile_results.csv / profile_report.txt.
+PROFILE_MODE = os.environ.get("SOKOBAN_PROFILE") or None
+
+
+def load_level(ref):
+    # "maps/level01.tmx" or "dataset.txt#3" (level 3 of a text collection).
+    path, sep, level_id = ref.rpartition("#")
+    if sep and os.path.isfile(path) and not os.path.isfile(ref):
+        from xsb import load_level as load_xsb_level
+        return load_xsb_level(path, level_id)
+    return Level(ref)
+
+
+def solver_class(algo_name):
+    name = algo_name.upper()
+    try:
+        if name.startswith("BFS"):
+            from algorithms.bfs import BFS
+            return BFS
+        if name.startswith("BIDIRECTIONAL"):
+            from algorithms.bidirectional import Bidirectional
+            return Bidirectional
+        if name.startswith("DFS"):
+            from algorithms.dfs import DFS
+            return DFS
+        if name.startswith("IDDFS"):
+            from algorithms.iddfs import IDDFS
+            return IDDFS
+        if name.startswith("IDA"):
+            from algorithms.idastar import IDAStar
+            return IDAStar
+        if name.startswith("GREEDY"):
+            from algorithms.greedy import GreedyBestFirst
+            return GreedyBestFirst
+        if name.startswith("ANYTIME"):
+            from algorithms.anytime import AnytimeAStar
+            return AnytimeAStar
+        if name.startswith("A"):
+            from algorithms.astar import AStar
+            return AStar
+    except Exception:
+        return None
+    return None
+
+
+def make_solver(game, algo_name, deadlocks=True):
+    # Names follow the menu: "A* (push)", "A* manhattan", "Greedy (push)", ...
+    cls = solver_class(algo_name)
+    if cls is None:
+        return None
+    name = algo_name.upper()
+    options = {"mode": "push" if "PUSH" in name else "move", "deadlocks": deadlocks}
+    if "MANHATTAN" in name:
+        options["heuristic"] = "manhattan"
+    if "MACRO" in name:
+        options["macros"] = True
+    return cls(game, **options)
+
+
+def check_solution(game, solution):
+    board = game.board
+    state = board.pack(game.get_start_state())
+    for action in solution:
+        state = board.apply(state, action)
+        if state is None:
+            return False
+    return board.is_goal(state)
+
+
+def attach_progress(solver, map_path, algo_name, queue=None, log_file=None):
+    if (queue is not None or log_file) and hasattr(solver, "progress"):
+        solver.progress = Progress(queue, log_file, tags={"map": map_path, "algo": algo_name})
+
+
+def run_solve(solver, start, map_path, algo_name, profile=None):
+    if not profile:
+        return solver.solve(start)
+    profiler = Profiler(solver, cprofile=profile == "cprofile")
+    try:
+        return profiler.run(solver.solve, start)
+    finally:
+        write_profile(profiler, map_path, algo_name)
+
+
+def solve(map_path, algo_name, cache=None, progress_file=None, profile=PROFILE_MODE):
+    start_time = time.time()
+    game = load_level(map_path)
+    if cache is not None:
+        hit = cache.get(game, algo_name)
+        if hit is not None:
+            hit.update({"solver": None, "cached": True})
+            return hit
+
+    solver = make_solver(game, algo_name)
+    if solver is None:
+        return {"solution": None, "expanded": 0, "time_sec": 0.0, "solver": None, "cached": False}
+    attach_progress(solver, map_path, algo_name, log_file=progress_file)
+    solution = run_solve(solver, game.get_start_state(), map_path, algo_name, profile)
+    if solution is not None and not check_solution(game, solution):
+        print("Invalid solution from", algo_name)
+        solution = None
+    result = {
+        "solution": solution,
+        "expanded": getattr(solver, "expanded", 0),
+        "time_sec": round(time.time() - start_time, 4),
+        "solver": solver,
+        "cached": False,
+    }
+    if cache is not None:
+        cache.put(game, algo_name, solution, result["expanded"], result["time_sec"])
+    return result
+
+
+def run_solver_func(map_path, algo_name, result_queue, progress_queue=None, progress_file=None):
+    try:
+        game = load_level(map_path)
+        start = game.get_start_state()
+
+        solver = make_solver(game, algo_name)
+
+        if solver is None:
+            result_queue.put((None, 0))
+            return
+        attach_progress(solver, map_path, algo_name, progress_queue, progress_file)
+
+        if hasattr(solver, "solve"):
+            result = run_solve(solver, start, map_path, algo_name, PROFILE_MODE)
+        elif callable(solver):
+            result = solver(game, start)
+        else:
+            result = None
+
+        expanded = getattr(solver, "expanded", 0)
+        if getattr(solver, "table", None) is not None:
+            print("Transposition table:", solver.table.report())
+        if result is not None and check_solution(game, result):
+            cache = open_cache()
+            if cache is not None:
+                cache.put(game, algo_name, result, expanded)
+                cache.close()
+        # gửi tuple về tiến trình chính
+        result_queue.put((result, expanded))
+
+    except Exception as e:
+        print("Error in solver process:", e)
+        try:
+            result_queue.put((None, 0))
+        except Exception:
+            pass
+
+
+def result_row(map_path, algo_name, time_sec, solution, expanded):
+    success = 0 if solution is None else 1
+    length = 0 if solution is None else len(solution)
+    return [map_path, algo_name, time_sec, length, expanded, success]
+
+
+def append_results(rows, csv_file=CSV_FILE):
+    write_header = not os.path.exists(csv_file)
+    with open(csv_file, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import queue
+import socket
+from collections import deque
+
+from runner import solver_class
+from worker_pool import SolverPool
+
+# Protocol: one JSON object per line in both directions.
+#
+#   -> {"cmd": "solve", "id": "any tag", "xsb": "<level text>", "algo": "A* (push)", "timeout": 60}
+#      (instead of "xsb": "tmx" with a TMX document, or "path" with a level
+#      reference on this machine such as "maps/level01.tmx" or "dataset.txt#3")
+#   <- {"event": "queued", "id": ..., "job": 7}
+#   <- {"event": "progress", "id": ..., "job": 7, "expanded": ..., "frontier": ..., ...}
+#   <- {"event": "result", "id": ..., "job": 7, "status": "ok", "solution": "uRRdL...", ...}
+#   -> {"cmd": "cancel", "job": 7}
+#   <- {"event": "error", "id": ..., "error": "..."}
+#
+# At most workers + queue_size jobs are accepted at once. When that many are
+# in flight the server reads at most READ_AHEAD more lines from the
+# connection (to notice a client that disconnects) and then stops reading
+# until a slot frees up, so a client sending too fast is slowed down by TCP
+# itself. Jobs without a "timeout" get DEFAULT_TIMEOUT seconds.
+
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 300
+READ_AHEAD = 16
+
+
+class SolverService:
+    def __init__(self, workers=None, queue_size=16, cache_size=16, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.progress_queue = multiprocessing.Queue()
+        self.pool = SolverPool(workers, cache_size=cache_size, progress_queue=self.progress_queue)
+        self.slots = asyncio.Semaphore(len(self.pool.workers) + queue_size)
+        self.clients = {}
+
+    async def pump(self):
+        # The pool is driven from the event loop; nothing here blocks.
+        while True:
+            for result in self.pool.poll(timeout=0):
+                self._finish(result)
+            try:
+                while True:
+                    record = self.progress_queue.get_nowait()
+                    client = self.clients.get(record.get("job"))
+                    if client is not None:
+                        record = dict(record, event="progress", id=client[1])
+                        self._send(client[0], record)
+            except queue.Empty:
+                pass
+            await asyncio.sleep(0.05)
+
+    def _finish(self, result):
+        client = self.clients.pop(result["job"], None)
+        self.slots.release()
+        if client is None:
+            return
+        solution = result["solution"]
+        self._send(client[0], {"event": "result", "id": client[1], "job": result["job"],
+                               "status": result["status"],
+                               "solution": "".join(solution) if solution is not None else None,
+                               "expanded": result["expanded"], "time_sec": result["time_sec"]})
+
+    def _send(self, writer, message):
+        if not writer.is_closing():
+            writer.write((json.dumps(message) + "\n").encode("utf-8"))
+
+    def _source(self, request):
+        for kind in ("xsb", "tmx"):
+            if request.get(kind):
+                return (kind, request[kind])
+        if request.get("path"):
+            return request["path"]
+        raise ValueError("Request needs one of: xsb, tmx, path")
+
+    def _timeout(self, request):
+        timeout = request.get("timeout")
+        if timeout is None:
+            return self.timeout
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not 0 < timeout < float("inf"):
+            raise ValueError("Timeout must be a positive number of seconds: %r" % (timeout,))
+        return timeout
+
+    async def _wait_slot(self, reader, backlog):
+        # Waits for a free slot while still reading ahead, so a client that
+        # goes away meanwhile is noticed. Returns False on end of file; lines
+        # read ahead are left in `backlog` for the caller.
+        acquire = asyncio.ensure_future(self.slots.acquire())
+        read = None
+        got = False
+        try:
+            while not acquire.done():
+                if read is None and len(backlog) < READ_AHEAD:
+                    read = asyncio.ensure_future(reader.readline())
+                waiting = {acquire} if read is None else {acquire, read}
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if read in done:
+                    line = read.result()
+                    read = None
+                    if not line:
+                        return False
+                    backlog.append(line)
+            got = True
+            return True
+        finally:
+            if read is not None:
+                # Only one readline may wait on the stream at a time, so the
+                # read is finished before the caller reads again.
+                read.cancel()
+                await asyncio.wait({read})
+                if not read.cancelled() and read.exception() is None and read.result():
+                    backlog.append(read.result())
+            if not acquire.done():
+                acquire.cancel()
+            elif not got and not acquire.cancelled():
+                self.slots.release()
+
+    async def handle(self, reader, writer):
+        jobs = []
+        backlog = deque()
+        try:
+            while True:
+                line = backlog.popleft() if backlog else await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    cmd = request.get("cmd", "solve")
+                    if cmd == "cancel":
+                        if not self.pool.cancel(request.get("job")):
+                            raise ValueError("No running job %s" % request.get("job"))
+                        continue
+                    if cmd != "solve":
+                        raise ValueError("Unknown command: %s" % cmd)
+                    source = self._source(request)
+                    algo = request.get("algo", "A* (push)")
+                    if solver_class(algo) is None:
+                        raise ValueError("Unknown solver: %s" % algo)
+                    timeout = self._timeout(request)
+                except (ValueError, AttributeError) as e:
+                    self._send(writer, {"event": "error", "id": _tag(line), "error": str(e)})
+                    await writer.drain()
+                    continue
+
+                if not await self._wait_slot(reader, backlog):
+                    break
+                job_id = self.pool.submit(source, algo, timeout)
+                self.clients[job_id] = (writer, request.get("id"))
+                jobs.append(job_id)
+                self._send(writer, {"event": "queued", "id": request.get("id"), "job": job_id})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Jobs of a client that went away are stopped; their slots are
+            # released when the pool reports them cancelled.
+            for job_id in jobs:
+                if self.clients.pop(job_id, None) is not None:
+                    self.pool.cancel(job_id)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT):
+        # TMX documents arrive on a single line, so allow long lines.
+        server = await asyncio.start_server(self.handle, host, port, limit=16 * 1024 * 1024)
+        print("Solver service on %s:%d with %d workers" % (host, port, len(self.pool.workers)))
+        pump = asyncio.ensure_future(self.pump())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            pump.cancel()
+            self.pool.close()
+
+
+def _tag(line):
+    try:
+        return json.loads(line).get("id")
+    except (ValueError, AttributeError):
+        return None
+
+
+def request_solve(algo="A* (push)", xsb=None, tmx=None, path=None, timeout=None,
+                  host="127.0.0.1", port=DEFAULT_PORT, tag=None):
+    # Blocking client: sends one solve request and yields every event for it
+    # until the result arrives.
+    request = {"cmd": "solve", "id": tag, "algo": algo, "timeout": timeout,
+               "xsb": xsb, "tmx": tmx, "path": path}
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        for line in sock.makefile("r", encoding="utf-8"):
+            event = json.loads(line)
+            yield event
+            if event["event"] in ("result", "error"):
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Sokoban solver service (JSON lines over TCP).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="solver processes (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=16, help="jobs waiting beyond the running ones")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="seconds per job when the request gives none")
+    args = parser.parse_args()
+
+    async def run():
+        await SolverService(args.workers, args.queue, timeout=args.timeout).serve(args.host, args.port)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import hashlib
+import sqlite3
+import time
+
+from bitboard import iter_bits
+
+CACHE_FILE = "solution_cache.db"
+
+
+def canonical_level(level):
+    # XSB text of the part of the level the player can ever walk on, cropped
+    # to its bounding box. Outside padding, unreachable floor and the TMX
+    # layout don't change it; moves are translation invariant so a cached
+    # solution replays on every level with the same canonical text.
+    board = level.board
+    start = board.pack(level.get_start_state())
+    region = board.reachable(start[0], 0) | start[1] | board.goal_mask
+    cells = [board.coords(i) for i in iter_bits(region)]
+    min_x = min(x for x, _ in cells)
+    max_x = max(x for x, _ in cells)
+    min_y = min(y for _, y in cells)
+    max_y = max(y for _, y in cells)
+
+    rows = []
+    for y in range(min_y, max_y + 1):
+        row = []
+        for x in range(min_x, max_x + 1):
+            i = board.index(x, y)
+            if not region >> i & 1:
+                row.append("#")
+                continue
+            goal = board.goal_mask >> i & 1
+            if start[1] >> i & 1:
+                row.append("*" if goal else "$")
+            elif i == start[0]:
+                row.append("+" if goal else "@")
+            else:
+                row.append("." if goal else " ")
+        rows.append("".join(row))
+    return "\n".join(rows)
+
+
+def cache_key(level, config):
+    text = canonical_level(level) + "\n" + config.strip().upper()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SolutionCache:
+    # Solutions on disk in SQLite, keyed by canonical level + solver config.
+    # When the stored solutions go over max_bytes the least recently used
+    # ones are dropped. Every hit is replayed by the rules before use.
+
+    def __init__(self, path=CACHE_FILE, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("CREATE TABLE IF NOT EXISTS solutions ("
+                        "key TEXT PRIMARY KEY, solution TEXT, expanded INTEGER, "
+                        "time_sec REAL, size INTEGER, last_used REAL)")
+        self.db.commit()
+
+    def get(self, level, config):
+        from runner import check_solution
+
+        key = cache_key(level, config)
+        row = self.db.execute("SELECT solution, expanded, time_sec FROM solutions WHERE key = ?",
+                              (key,)).fetchone()
+        if row is None:
+            return None
+        solution = list(row[0])
+        if not check_solution(level, solution):
+            self.db.execute("DELETE FROM solutions WHERE key = ?", (key,))
+            self.db.commit()
+            return None
+        self.db.execute("UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return {"solution": solution, "expanded": row[1], "time_sec": row[2]}
+
+    def put(self, level, config, solution, expanded=0, time_sec=0.0):
+        if solution is None:
+            return
+        text = "".join(solution)
+        self.db.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?)",
+                        (cache_key(level, config), text, expanded, time_sec, len(text), time.time()))
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM solutions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM solutions ORDER BY last_used").fetchall():
+            self.db.execute("DELETE FROM solutions WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        self.db.close()
+
+
+def open_cache(path=CACHE_FILE):
+    try:
+        return SolutionCache(path)
+    except (sqlite3.Error, OSError) as e:
+        print("Solution cache unavailable:", e)
+        return None
+
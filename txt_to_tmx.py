@@ -12,7 +12,7 @@ def make_csv_block(lines):
             result.append(joined)
     return "\n".join(result)
 
-def make_tmx(map_lines, map_id, tile_size=32, out_dir="maps"):
+def make_tmx(map_lines, map_id, tile_size=32, out_dir="maps", verbose=True):
     height = len(map_lines)
     width = max(len(line) for line in map_lines) if height > 0 else 0
     map_lines = [line.ljust(width) for line in map_lines]
@@ -89,26 +89,32 @@ def make_tmx(map_lines, map_id, tile_size=32, out_dir="maps"):
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, f"map_{map_id}.tmx")
     ET.ElementTree(root).write(out_path, encoding="utf-8", xml_declaration=True)
-    print("Created:", out_path)
+    if verbose:
+        print("Created:", out_path)
+    return out_path
 
-def batch_convert(txt_file, out_dir="maps"):
+def read_levels(txt_file):
     with open(txt_file, 'r', encoding='utf-8') as f:
         raw_lines = f.read().splitlines()
 
     current_map = []
     map_id = None
-    n = 0
     for line in raw_lines + ["; end"]:
         if line.strip().startswith(';'):
             if current_map and map_id is not None:
-                make_tmx(current_map, map_id, out_dir=out_dir)
-                n += 1
+                yield map_id, current_map
                 current_map = []
             parts = line.strip().split()
             map_id = parts[1] if len(parts) >= 2 and parts[1].isdigit() else None
         else:
             if line != "":
                 current_map.append(line.rstrip("\n"))
+
+def batch_convert(txt_file, out_dir="maps"):
+    n = 0
+    for map_id, map_lines in read_levels(txt_file):
+        make_tmx(map_lines, map_id, out_dir=out_dir)
+        n += 1
     print(f"Finished: created {n} maps in '{out_dir}'")
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+from collections import OrderedDict, deque
+
+from level import Level
+from progress import Progress, peak_rss_mb
+from runner import check_solution, load_level, make_solver
+from xsb import is_level_line
+
+
+class Cancelled(Exception):
+    pass
+
+
+class JobControl(Progress):
+    # Progress hook that also stops the search once the job is cancelled or
+    # past its deadline. Solvers call it every CHECK_EVERY expansions, so
+    # the worker gets control back quickly and stays warm.
+
+    def __init__(self, cancel_event, deadline=None, queue=None, tags=None):
+        super().__init__(queue, tags=tags)
+        self.cancel_event = cancel_event
+        self.deadline = deadline
+
+    def update(self, expanded, frontier, closed, best_f, force=False):
+        if self.cancel_event.is_set():
+            raise Cancelled("cancelled")
+        if self.deadline is not None and time.time() > self.deadline:
+            raise Cancelled("timeout")
+        return super().update(expanded, frontier, closed, best_f, force)
+
+
+def level_key(source):
+    # A source is a level reference for runner.load_level ("x.tmx",
+    # "pack.txt#3") or a ("xsb" | "tmx", text) pair. A file's mtime is part
+    # of the key so an edited map is reloaded.
+    if not isinstance(source, str):
+        return (source[0], hashlib.sha1(source[1].encode("utf-8")).hexdigest())
+    path = source.split("#", 1)[0]
+    try:
+        return (source, os.path.getmtime(path))
+    except OSError:
+        return (source, None)
+
+
+def load_source(source):
+    if isinstance(source, str):
+        return load_level(source)
+    kind, text = source
+    if kind == "xsb":
+        lines = [line for line in text.splitlines() if is_level_line(line)]
+        if not lines:
+            raise ValueError("No level in XSB text")
+        return Level.from_xsb(lines, name="xsb")
+    if kind == "tmx":
+        return Level.from_tmx(text, name="tmx")
+    raise ValueError("Unknown level format: %s" % kind)
+
+
+def worker_main(worker_id, jobs, results, cancel_event, cache_size, progress_queue=None):
+    # Levels stay loaded (map, dead squares, push distance tables built
+    # lazily by the solvers) for the last `cache_size` maps used.
+    levels = OrderedDict()
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, map_path, algo_name, timeout = job
+        start = time.time()
+        solution, expanded = None, 0
+        try:
+            key = level_key(map_path)
+            level = levels.pop(key, None)
+            if level is None:
+                level = load_source(map_path)
+            levels[key] = level
+            while len(levels) > cache_size:
+                levels.popitem(last=False)
+
+            solver = make_solver(level, algo_name)
+            if solver is None:
+                raise ValueError("Unknown solver: %s" % algo_name)
+            if hasattr(solver, "progress"):
+                name = map_path if isinstance(map_path, str) else map_path[0]
+                solver.progress = JobControl(cancel_event, start + timeout if timeout else None,
+                                             progress_queue, tags={"job": job_id, "map": name,
+                                                                   "algo": algo_name})
+            try:
+                solution = solver.solve(level.get_start_state())
+            finally:
+                expanded = getattr(solver, "expanded", 0)
+            if solution is not None and not check_solution(level, solution):
+                print("Invalid solution from", algo_name)
+                solution = None
+            status = "ok" if solution is not None else "unsolved"
+        except Cancelled as e:
+            status = str(e)
+        except MemoryError:
+            status = "memory"
+        except Exception as e:
+            print("Error in pool worker", worker_id, map_path, algo_name, ":", e)
+            status = "error"
+        results.put((worker_id, job_id, status, solution, expanded,
+                     round(time.time() - start, 4), peak_rss_mb()))
+
+
+class _Worker:
+    def __init__(self, worker_id, results, cache_size, progress_queue):
+        self.id = worker_id
+        self.jobs = multiprocessing.Queue()
+        self.cancel_event = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=worker_main,
+            args=(worker_id, self.jobs, results, self.cancel_event, cache_size, progress_queue),
+            daemon=True)
+        self.process.start()
+        # Mirror of the worker's level LRU, used to send jobs for a level
+        # to a worker that already has it loaded.
+        self.levels = OrderedDict()
+        self.cache_size = cache_size
+        self.job = None
+        self.started = 0.0
+        self.cancelled_at = None
+
+    def assign(self, job_id, map_path, algo_name, timeout):
+        self.cancel_event.clear()
+        self.job = job_id
+        self.started = time.time()
+        self.cancelled_at = None
+        key = level_key(map_path)
+        self.levels.pop(key, None)
+        self.levels[key] = True
+        while len(self.levels) > self.cache_size:
+            self.levels.popitem(last=False)
+        self.jobs.put((job_id, map_path, algo_name, timeout))
+
+    def stop(self):
+        try:
+            self.jobs.put(None)
+        except Exception:
+            pass
+
+
+class SolverPool:
+    # Long-lived solver processes fed over queues. Each job has its own
+    # timeout and can be cancelled; the search is stopped cooperatively and
+    # the worker is only killed (and replaced) if it doesn't answer within
+    # `grace` seconds.
+
+    def __init__(self, workers=None, cache_size=16, grace=2.0, progress_queue=None):
+        self.cache_size = cache_size
+        self.grace = grace
+        self.progress_queue = progress_queue
+        self.results = multiprocessing.Queue()
+        self.workers = [self._spawn(i) for i in range(workers or os.cpu_count() or 1)]
+        self.jobs = {}
+        self.pending = deque()
+        self.ready = []
+        self.finished = {}
+        self.next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _spawn(self, worker_id):
+        return _Worker(worker_id, self.results, self.cache_size, self.progress_queue)
+
+    def submit(self, map_path, algo_name, timeout=None):
+        self.next_id += 1
+        job_id = self.next_id
+        self.jobs[job_id] = (map_path, algo_name, timeout)
+        self.pending.append(job_id)
+        self._dispatch()
+        return job_id
+
+    def cancel(self, job_id):
+        if job_id in self.pending:
+            self.pending.remove(job_id)
+            self._finish(job_id, "cancelled", None, 0, 0.0, 0.0)
+            return True
+        for worker in self.workers:
+            if worker.job == job_id and worker.cancelled_at is None:
+                worker.cancel_event.set()
+                worker.cancelled_at = time.time()
+                return True
+        return False
+
+    def _dispatch(self):
+        for job_id in list(self.pending):
+            idle = [w for w in self.workers if w.job is None]
+            if not idle:
+                return
+            map_path, algo_name, timeout = self.jobs[job_id]
+            key = level_key(map_path)
+            warm = [w for w in idle if key in w.levels]
+            worker = (warm or idle)[0]
+            self.pending.remove(job_id)
+            worker.assign(job_id, map_path, algo_name, timeout)
+
+    def _finish(self, job_id, status, solution, expanded, time_sec, rss):
+        map_path, algo_name, _ = self.jobs.pop(job_id)
+        result = {"job": job_id, "map": map_path, "algo": algo_name, "status": status,
+                  "solution": solution, "expanded": expanded, "time_sec": time_sec,
+                  "peak_rss_mb": rss}
+        self.ready.append(result)
+
+    def _replace(self, worker):
+        worker.process.terminate()
+        worker.process.join()
+        self.workers[self.workers.index(worker)] = self._spawn(worker.id)
+
+    def poll(self, timeout=0.1):
+        # Collects finished jobs, enforces deadlines and hands out pending
+        # jobs. Returns the results finished since the last call.
+        try:
+            message = self.results.get(timeout=timeout)
+            while True:
+                worker_id, job_id, status, solution, expanded, time_sec, rss = message
+                for worker in self.workers:
+                    if worker.id == worker_id and worker.job == job_id:
+                        worker.job = None
+                if job_id in self.jobs:
+                    self._finish(job_id, status, solution, expanded, time_sec, rss)
+                message = self.results.get_nowait()
+        except queue.Empty:
+            pass
+
+        now = time.time()
+        for worker in list(self.workers):
+            if worker.job is None:
+                if not worker.process.is_alive():
+                    self._replace(worker)
+                continue
+            timeout = self.jobs[worker.job][2]
+            if not worker.process.is_alive():
+                status = "crashed"
+            elif worker.cancelled_at is not None and now - worker.cancelled_at > self.grace:
+                status = "cancelled"
+            elif timeout and now - worker.started > timeout + self.grace:
+                status = "timeout"
+            else:
+                continue
+            self._finish(worker.job, status, None, 0, round(now - worker.started, 4), 0.0)
+            self._replace(worker)
+
+        self._dispatch()
+        done, self.ready = self.ready, []
+        return done
+
+    def wait(self, job_id):
+        # Results of other jobs that finish meanwhile are kept for their
+        # own wait() or map().
+        while job_id not in self.finished:
+            for result in self.poll():
+                self.finished[result["job"]] = result
+        return self.finished.pop(job_id)
+
+    def solve(self, map_path, algo_name, timeout=None):
+        return self.wait(self.submit(map_path, algo_name, timeout))
+
+    def map(self, jobs, timeout=None):
+        # Runs (map_path, algo_name) pairs and yields results as they finish.
+        ids = set(self.submit(map_path, algo_name, timeout) for map_path, algo_name in jobs)
+        while ids:
+            for result in self.poll():
+                self.finished[result["job"]] = result
+            for job_id in [i for i in ids if i in self.finished]:
+                ids.discard(job_id)
+                yield self.finished.pop(job_id)
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.process.join(1)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
@@ -0,0 +1,141 @@
+import json
+import os
+
+from level import Level
+
+# Standard Sokoban text notation, as used by dataset.txt and public XSB packs.
+WALL, FLOOR, GOAL = "#", " ", "."
+PLAYER, PLAYER_ON_GOAL = "@", "+"
+BOX, BOX_ON_GOAL = "$", "*"
+LEVEL_CHARS = set("#@+$*. -_")
+
+
+def is_level_line(line):
+    stripped = line.rstrip("\r\n")
+    return "#" in stripped and set(stripped) <= LEVEL_CHARS
+
+
+def parse_xsb(lines):
+    lines = [line.rstrip("\r\n") for line in lines]
+    height = len(lines)
+    width = max((len(line) for line in lines), default=0)
+    game_map = [[" " for _ in range(width)] for _ in range(height)]
+    player = None
+    boxes = []
+    goals = []
+    for y, line in enumerate(lines):
+        for x, c in enumerate(line):
+            if c == WALL:
+                game_map[y][x] = "#"
+            if c in (GOAL, PLAYER_ON_GOAL, BOX_ON_GOAL):
+                game_map[y][x] = "."
+                goals.append((x, y))
+            if c in (PLAYER, PLAYER_ON_GOAL):
+                player = (x, y)
+            if c in (BOX, BOX_ON_GOAL):
+                boxes.append((x, y))
+    return game_map, player, boxes, sorted(goals), width, height
+
+
+def iter_levels(path):
+    # Yields (level_id, title, lines) one level at a time without reading
+    # the whole file. Ids count levels from 1; the title is the last
+    # comment or "Title:" line seen before the level, if any.
+    level_id = 0
+    title = ""
+    current = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if is_level_line(line):
+                current.append(line.rstrip("\r\n"))
+                continue
+            if current:
+                level_id += 1
+                yield str(level_id), title, current
+                current = []
+                title = ""
+            text = line.strip()
+            if text.startswith(";"):
+                title = text[1:].strip()
+            elif text.lower().startswith("title:"):
+                title = text[6:].strip()
+    if current:
+        yield str(level_id + 1), title, current
+
+
+def stream_levels(path):
+    for level_id, title, lines in iter_levels(path):
+        yield level_id, Level.from_xsb(lines, name="%s#%s" % (path, level_id))
+
+
+class LevelIndex:
+    # Byte offset of every level in a collection, so one level can be read
+    # with a single seek. The index is saved next to the file as
+    # "<file>.idx" and rebuilt when the file's size or mtime changes.
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        stat = os.stat(path)
+        self.stamp = [stat.st_size, int(stat.st_mtime)]
+        self.offsets = self._load() or self._build()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("stamp") != self.stamp:
+            return None
+        return data.get("offsets")
+
+    def _build(self):
+        offsets = {}
+        level_id = 0
+        in_level = False
+        offset = 0
+        with open(self.path, "rb") as f:
+            for raw in f:
+                line = raw.decode("utf-8", errors="replace")
+                if is_level_line(line):
+                    if not in_level:
+                        level_id += 1
+                        offsets[str(level_id)] = offset
+                        in_level = True
+                else:
+                    in_level = False
+                offset += len(raw)
+        try:
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump({"stamp": self.stamp, "offsets": offsets}, f)
+        except OSError:
+            pass
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def ids(self):
+        return sorted(self.offsets, key=int)
+
+    def lines(self, level_id):
+        offset = self.offsets.get(str(level_id))
+        if offset is None:
+            raise KeyError("No level %s in %s" % (level_id, self.path))
+        lines = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                line = raw.decode("utf-8", errors="replace")
+                if not is_level_line(line):
+                    break
+                lines.append(line.rstrip("\r\n"))
+        return lines
+
+    def get(self, level_id):
+        return Level.from_xsb(self.lines(level_id), name="%s#%s" % (self.path, level_id))
+
+
+def load_level(path, level_id):
+    return LevelIndex(path).get(level_id)